@@ -8,17 +8,35 @@
 # Copyright:   (c) kristjan.vilgo 2018
 # Licence:     GPL2
 #-------------------------------------------------------------------------------
-from requests import Session
+import os
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 from zeep import Client as SOAPClient
 from zeep.transports import Transport
-from zeep.plugins import HistoryPlugin
-from lxml import etree
+from zeep.settings import Settings
+
+from EDX.cache import WSDLCache, CachingTransport, load_document
+from EDX.fast_path import FastService
+from EDX.streaming import receive_message_to_sink, send_message_from_file
+from EDX.large_messages import huge_tree_parser, response_size_limit
+from EDX.status import StatusTracker, DELIVERY_STATES
+from EDX.instrumentation import Instrumentation, TimedSession
+from EDX.metrics import MetricsRegistry
+from EDX.capture import ExchangeCapture
 
 import urllib3
 urllib3.disable_warnings()
 
-# TODO - add logging
+# MADES WSDL shipped with the package, used when Client is created with offline=True
+BUNDLED_WSDL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wsdl", "madesInWSInterface.wsdl")
+
+# Outcome of one message of Client.send_many, error is the raised exception or None
+SendResult = namedtuple("SendResult", ["index", "message_id", "error"])
+
 
 class Client:
     """
@@ -29,68 +47,176 @@ class Client:
     configures the client for the specified web service using WSDL (Web Services Description Language).
 
     Attributes:
+        session: The requests.Session used for all HTTP traffic.
+        transport: The zeep Transport wrapping the session.
+        address: The web service endpoint address.
+        status_tracker: StatusTracker shared by send_message(future=True/wait=True) calls, created on first use. Can be replaced with a custom configured one.
         service: The raw SOAP service object which can be used to make requests to the web service, should not be used as methods in this class already expose all webservice functions.
-        history: If debugging is enabled, this attribute stores the history of transactions.
+        history: EDX.capture.ExchangeCapture holding the last raw HTTP exchanges of each thread, filled only if debugging is enabled.
+        instrumentation: EDX.instrumentation.Instrumentation timing every call, its observers receive each finished Operation.
+        metrics: EDX.metrics.MetricsRegistry updated by every call, None unless enabled with 'metrics'.
+        tracer: EDX.tracing.Tracer creating a span per call, None unless given with 'tracer'.
         debug: Boolean flag to enable or disable debugging.
 
     Args:
         server (str): The server address or IP where the web service is hosted. This parameter is mandatory.
         username (str, optional): The username for HTTP basic authentication. Defaults to None.
         password (str, optional): The password for HTTP basic authentication. Defaults to None.
-        debug (bool, optional): Flag to enable or disable debugging features. Defaults to False.
+        debug (bool/EDX.capture.ExchangeCapture, optional): True to capture recent HTTP exchanges in 'history' with payloads cut down, or a
+            configured ExchangeCapture (ring size, sampling rate, truncation). Defaults to False.
         verify (bool/str, optional): Flag to enable SSL verification or a path to a CA_BUNDLE file or directory with certificates. Defaults to False.
         auth (requests.auth.AuthBase, optional): Custom HTTP authentication mechanism. Any auth supported by "requests.auth" can be used. Defaults to None.
         wsse (zeep.wsse.WSSE, optional): Web Service Security object to add security tokens to SOAP messages. Defaults to None.
+        cache_dir (str, optional): Directory for the persistent WSDL/XSD cache. If set, WSDL is loaded from disk and parsed only once per process. Defaults to None (no cache).
+        cache_ttl (int/float, optional): Seconds a cached WSDL is used before it is revalidated with a conditional request. None means never revalidate. Defaults to 86400.
+        offline (bool, optional): Build the service from the WSDL bundled with the package instead of downloading it from the server. Defaults to False.
+        engine (str, optional): "zeep" for zeep's generic XSD (de)serialisation or "fast" for precompiled envelope templates and XPath response parsing. Defaults to "zeep".
+        large_messages (bool, optional): Lift lxml limits on text node size (~10 MB) and tree depth, needed to receive large payloads in memory. Defaults to False.
+        max_message_size (int, optional): Maximum response body size in bytes, larger responses raise EDX.large_messages.MessageTooLarge before they are read in full. Defaults to None (no limit).
+        pool_maxsize (int, optional): Maximum number of pooled connections per host, set it to at least the number of threads sharing the Client. Defaults to 10.
+        pool_block (bool, optional): If True, pool_maxsize is a hard per-host limit and threads wait for a free connection instead of opening extra, non-pooled ones. Defaults to False.
+        pool_connections (int, optional): Number of per-host connection pools kept. Defaults to 10.
+        keep_alive (bool, optional): Reuse connections between calls. Disable only for servers or proxies that mishandle persistent connections. Defaults to True.
+        metrics (bool/EDX.metrics.MetricsRegistry, optional): True to collect call metrics in a new registry, or a registry to share between clients. Defaults to None (no metrics).
+        tracer (EDX.tracing.Tracer, optional): Creates a span per call with envelope build, HTTP transfer and response parse child spans. Defaults to None (no tracing).
 
     Methods:
         _print_last_message_exchange: Prints the last sent and received SOAP messages. Works only if debug mode is enabled.
         connectivity_test: Performs a connectivity test with the given receiver EIC and business type. Returns a message ID.
         send_message: Sends a message to the specified receiver with given parameters. Returns a message ID.
+        send_file: Sends content from a path, file object or mmap, streaming the envelope. Returns a message ID.
+        send_many: Sends many messages concurrently. Yields a SendResult per message in input order.
         check_message_status: Checks the status of a message using its message ID. Returns the status of the message.
         receive_message: Receives a message of a specified business type. Returns the received message and the remaining message count.
+        receive_message_to_file: Receives a message and streams its content to a path, file or callable. Returns the message metadata and the remaining message count.
+        peek_message: Receives only the header of the next message, without its content.
+        receive_selected: Peeks the next message and downloads its content only if a filter accepts the header.
+        drain: Generator that receives messages until the queue is empty, confirming each one in the background.
         confirm_received_message: Confirms the receipt of a message using its message ID. Returns the same message ID as confirmation.
+        close: Stops the status_tracker, if it was started, and closes the HTTP session.
 
     Notes:
         - If 'username' is provided, HTTP basic authentication is set up with 'username' and 'password' and will perform preemptive auth.
         - If 'auth' is provided, it is used as the authentication mechanism.
         - If 'wsse' is provided, it will be used to add security tokens to the SOAP messages, enabling WS-Security.
-        - Enabling 'debug' logs detailed information about the raw SOAP requests and responses.
+        - If 'cache_dir' is provided, the WSDL is downloaded only when missing, changed or its content hash does not match; preemptive auth then uses a conditional request.
+        - If 'offline' is True, no request is made during initialisation, only the service address is bound to 'server'. This also skips the preemptive auth request.
+        - With engine="fast" no WSDL is loaded at all and return values are dict based objects with the same fields as zeep objects. WS-Security ('wsse') is not supported by it.
+        - With 'large_messages' the whole payload is still held in memory (about 3x its size with zeep), use receive_message_to_file for payloads that should not be.
+        - One Client can be shared between threads. All calls go through one requests.Session whose connection pool is sized by 'pool_maxsize'; debug history is kept per thread.
+        - Enabling 'debug' keeps the raw SOAP requests and responses with bounded memory, use ExchangeCapture(sample_rate=...) to keep it on in production.
+        - Use the Client as context manager or call close() when done, so the status_tracker thread and pooled connections are released.
+        - Every call is logged to the "EDX" logger at DEBUG level with its serialize, network and parse time, body sizes and message IDs.
+          Nothing is measured while that level is not enabled and no observers are added to 'instrumentation'.
     """
 
-    def __init__(self, server, username=None, password=None, debug=False, verify=False, auth=None, wsse=None):
+    def __init__(self, server, username=None, password=None, debug=False, verify=False, auth=None, wsse=None, cache_dir=None, cache_ttl=86400, offline=False, engine="zeep", large_messages=False, max_message_size=None,
+                 pool_maxsize=10, pool_block=False, pool_connections=10, keep_alive=True, metrics=None, tracer=None):
 
         """At minimum server address or IP must be provided"""
 
-        wsdl = f'{server}/ws/madesInWSInterface.wsdl'
+        if engine not in ("zeep", "fast"):
+            raise ValueError(f"Unknown engine {engine!r}, use 'zeep' or 'fast'")
+
+        if engine == "fast" and wsse:
+            raise ValueError("WS-Security is supported only with engine='zeep'")
+
+        wsdl = BUNDLED_WSDL if offline else f'{server}/ws/madesInWSInterface.wsdl'
 
         # Authenticate HTTP session
-        session = Session()
+        session = TimedSession()
         session.verify = verify
+        self.session = session
+
+        # Connection pooling, shared by all threads using this client
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+
+        if max_message_size:
+            session.hooks["response"].append(response_size_limit(max_message_size))
+
+        if cache_dir:
+            transport = CachingTransport(WSDLCache(cache_dir, cache_ttl), session=session)
+        else:
+            transport = Transport(session=session)
 
         if username:
             session.auth = HTTPBasicAuth(username, password)
-            session.get(wsdl)  # Preemptive auth, needed for keycloak
+            if offline:
+                pass  # No request at all, auth is sent with the first call
+            elif cache_dir:
+                transport.revalidate(wsdl, transport.wsdl_cache.get(wsdl))  # Preemptive auth, doubles as WSDL download
+            else:
+                session.get(wsdl)  # Preemptive auth, needed for keycloak
 
         if auth:
             session.auth = auth
 
-        transport = Transport(session=session)
-
-        # Add history plugin for debug
-        self.history = HistoryPlugin()
-        self.debug = debug
+        # Capture raw exchanges for debug
+        if debug is True:
+            debug = ExchangeCapture()
 
-        plugins = []
+        self.history = debug or ExchangeCapture()
+        self.debug = bool(debug)
 
         if debug:
-            plugins.append(self.history)
+            session.hooks["response"].append(self.history.hook)
+
+        self.transport = transport
+        self.address = f'{server}/ws/madesInWSInterface'
+        self.wsse = wsse
+        self.instrumentation = Instrumentation()
+
+        self.metrics = MetricsRegistry() if metrics is True else metrics or None
+        if self.metrics is not None:
+            self.instrumentation.observers.append(self.metrics.observe)
+
+        self.tracer = tracer
+        if tracer is not None:
+            self.instrumentation.observers.append(tracer.observe)
+
+        self._status_tracker = None
+        self._status_tracker_lock = threading.Lock()
+
+        if engine == "fast":
+            self.service = FastService(transport, self.address)
+
+            if large_messages:
+                self.service.parser = huge_tree_parser
+
+        else:
+            settings = Settings(xml_huge_tree=large_messages)
+
+            # Create SOAP client
+            if cache_dir or offline:
+                wsdl = load_document(wsdl, transport, settings)
+
+            client = SOAPClient(wsdl, transport=transport, wsse=wsse, settings=settings)
+
+            self.service = client.create_service(
+                binding_name='{http://mades.entsoe.eu/}MadesEndpointSOAP12',
+                address=self.address)
+
+    def __enter__(self):
+        return self
 
-        # Create SOAP client
-        client = SOAPClient(wsdl, transport=transport, plugins=plugins, wsse=wsse)
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.close()
 
-        self.service = client.create_service(
-            binding_name='{http://mades.entsoe.eu/}MadesEndpointSOAP12',
-            address=f'{server}/ws/madesInWSInterface')
+    def close(self):
+        """Stops the status_tracker, pending send_message futures are cancelled, and closes the HTTP session"""
+
+        with self._status_tracker_lock:
+            tracker, self._status_tracker = self._status_tracker, None
+
+        if tracker is not None:
+            tracker.close()
+
+        self.session.close()
 
     def _print_last_message_exchange(self):
         """Prints out last sent and received SOAP messages"""
@@ -99,19 +225,25 @@ class Client:
             print("WARNING - debug mode must be enabled for function _print_last_message_exchange to work")
             return
 
-        messages = {"SENT":     self.history.last_sent,
-                    "RECEIVED": self.history.last_received}
+        exchange = self.history.last()
+
+        if exchange is None:
+            print("WARNING - no message exchange captured on this thread")
+            return
+
+        messages = {"SENT":     (exchange.request_headers, exchange.request_text(pretty=True)),
+                    "RECEIVED": (exchange.response_headers, exchange.response_text(pretty=True))}
         print("-" * 50)
 
-        for message in messages:
+        for message, (http_headers, envelope) in messages.items():
 
             print(f"### {message} HTTP HEADER ###")
             print('\n' * 1)
-            print(messages[message]["http_headers"])
+            print(http_headers)
             print('\n' * 1)
             print(f"### {message} HTTP ENVELOPE START ###")
             print('\n' * 1)
-            print(etree.tostring(messages[message]["envelope"], pretty_print=True).decode())
+            print(envelope)
             print(f"### {message} HTTP ENVELOPE END ###")
             print('\n' * 1)
 
@@ -120,41 +252,245 @@ class Client:
     def connectivity_test(self, reciver_EIC, business_type):
         """ConnectivityTest(receiverCode: xsd:string, businessType: xsd:string) -> messageID: xsd:string"""
 
-        message_id = self.service.ConnectivityTest(reciver_EIC, business_type)
+        with self.instrumentation.operation("connectivity_test", receiverCode=reciver_EIC, businessType=business_type) as operation:
+            message_id = self.service.ConnectivityTest(reciver_EIC, business_type)
+            operation.set(messageID=message_id)
 
         return message_id
 
-    def send_message(self, receiver_EIC, business_type, content, sender_EIC="", ba_message_id="", conversation_id=""):
+    @property
+    def status_tracker(self):
+
+        with self._status_tracker_lock:
+            if self._status_tracker is None:
+                self._status_tracker = StatusTracker(self, terminal_states=DELIVERY_STATES)
+
+        return self._status_tracker
+
+    @status_tracker.setter
+    def status_tracker(self, tracker):
+        self._status_tracker = tracker
+
+    def send_message(self, receiver_EIC, business_type, content, sender_EIC="", ba_message_id="", conversation_id="", future=False, wait=False, timeout=None):
         """SendMessage(message: ns0:SentMessage, conversationID: xsd:string) -> messageID: xsd:string
-           ns0:SentMessage(receiverCode: xsd:string, businessType: xsd:string, content: xsd:base64Binary, senderApplication: xsd:string, baMessageID: xsd:string)"""
+           ns0:SentMessage(receiverCode: xsd:string, businessType: xsd:string, content: xsd:base64Binary, senderApplication: xsd:string, baMessageID: xsd:string)
+           future=True - returns a concurrent.futures.Future resolved with the MessageStatus once the message is DELIVERED, RECEIVED or FAILED,
+                         its message_id attribute holds the messageID. Status is polled by the shared status_tracker, not by the caller.
+           wait=True   - blocks until then and returns the final MessageStatus. After 'timeout' seconds (default None, no limit)
+                         concurrent.futures.TimeoutError is raised with the messageID in its message_id attribute and polling stops."""
 
         message_dic = {"receiverCode": receiver_EIC, "businessType": business_type, "content": content, "senderApplication": sender_EIC, "baMessageID": ba_message_id}
-        message_id  = self.service.SendMessage(message_dic, conversation_id)
+
+        with self.instrumentation.operation("send_message", receiverCode=receiver_EIC, businessType=business_type, baMessageID=ba_message_id) as operation:
+            message_id = self.service.SendMessage(message_dic, conversation_id)
+            operation.set(messageID=message_id)
+
+        if future or wait:
+            delivery = self.status_tracker.track(message_id)
+            delivery.message_id = message_id
+
+            if not wait:
+                return delivery
+
+            try:
+                return delivery.result(timeout)
+            except TimeoutError as error:
+                self.status_tracker.untrack(message_id)
+                error.message_id = message_id
+                raise
+
+        return message_id
+
+    def send_file(self, receiver_EIC, business_type, file, sender_EIC="", ba_message_id="", conversation_id=""):
+        """Same as send_message, but 'file' is a path, a file object opened in binary mode or a bytes-like object (mmap, memoryview).
+           Content is read and base64 encoded in chunks while the request is sent, so memory use does not grow with file size.
+           Not available with WS-Security."""
+
+        if self.wsse:
+            raise ValueError("send_file does not support WS-Security")
+
+        with self.instrumentation.operation("send_file", receiverCode=receiver_EIC, businessType=business_type, baMessageID=ba_message_id) as operation:
+            message_id = send_message_from_file(self.transport, self.address, file, receiver_EIC, business_type, sender_EIC, ba_message_id, conversation_id)
+            operation.set(messageID=message_id)
 
         return message_id
 
+    def send_many(self, messages, max_workers=8, max_in_flight=None):
+        """Sends messages concurrently over the pooled session and yields SendResult(index, message_id, error) in input order.
+           Each message is a dict of send_message keyword arguments, or of send_file arguments when it has 'file' instead of 'content'.
+           A failing message yields its exception in 'error' and does not stop the batch.
+           'messages' is consumed lazily and at most 'max_in_flight' (default 2 * max_workers) messages are submitted but not yet
+           yielded, so memory stays flat for any batch size. Set pool_maxsize of the Client to at least max_workers."""
+
+        max_in_flight = max_in_flight or 2 * max_workers
+
+        def send(message):
+            if "file" in message:
+                return self.send_file(**message)
+            return self.send_message(**message)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            in_flight = deque()
+
+            def result(index, future):
+                try:
+                    return SendResult(index, future.result(), None)
+                except Exception as error:
+                    return SendResult(index, None, error)
+
+            for index, message in enumerate(messages):
+
+                if len(in_flight) >= max_in_flight:
+                    yield result(*in_flight.popleft())
+
+                in_flight.append((index, executor.submit(send, message)))
+
+            while in_flight:
+                yield result(*in_flight.popleft())
+
     def check_message_status(self, message_id):
         """CheckMessageStatus(messageID: xsd:string) -> messageStatus: ns0:MessageStatus
            ns0:MessageStatus(messageID: xsd:string, state: ns0:MessageState, receiverCode: xsd:string, senderCode: xsd:string, businessType: xsd:string, senderApplication: xsd:string, baMessageID: xsd:string, sendTimestamp: xsd:dateTime, receiveTimestamp: xsd:dateTime, trace: ns0:MessageTrace)"""
 
-        status = self.service.CheckMessageStatus(message_id)
+        with self.instrumentation.operation("check_message_status", messageID=message_id) as operation:
+            status = self.service.CheckMessageStatus(message_id)
+            operation.set(state=status.state)
 
         return status
 
     def receive_message(self, business_type="*", download_message=True, auto_confirm=False):
         """ReceiveMessage(businessType: xsd:string, downloadMessage: xsd:boolean) -> receivedMessage: ns0:ReceivedMessage, remainingMessagesCount: xsd:long"""
 
-        received_message = self.service.ReceiveMessage(business_type, download_message)
+        with self.instrumentation.operation("receive_message", businessType=business_type, downloadMessage=download_message) as operation:
+            received_message = self.service.ReceiveMessage(business_type, download_message)
+            operation.set(messageID=received_message.receivedMessage.messageID if received_message.receivedMessage is not None else None,
+                          remainingMessagesCount=received_message.remainingMessagesCount)
 
         if auto_confirm:
             self.confirm_received_message(received_message.receivedMessage.messageID)
 
         return received_message
 
+    def receive_message_to_file(self, sink, business_type="*", auto_confirm=False):
+        """Same as receive_message with download_message=True, but content is streamed to 'sink' instead of kept in memory.
+           'sink' is a file path, an object with write() or a callable taking bytes. Path is created only if a message is received.
+           Returned receivedMessage has content=None and size of written content in bytes. Not available with WS-Security."""
+
+        if self.wsse:
+            raise ValueError("receive_message_to_file does not support WS-Security")
+
+        with self.instrumentation.operation("receive_message_to_file", businessType=business_type) as operation:
+            received_message = receive_message_to_sink(self.transport, self.address, sink, business_type)
+            operation.set(messageID=received_message.receivedMessage.messageID if received_message.receivedMessage is not None else None,
+                          remainingMessagesCount=received_message.remainingMessagesCount)
+
+        if auto_confirm and received_message.receivedMessage is not None:
+            self.confirm_received_message(received_message.receivedMessage.messageID)
+
+        return received_message
+
+    def peek_message(self, business_type="*"):
+        """Same as receive_message with download_message=False, receivedMessage has all fields except content"""
+
+        return self.receive_message(business_type, download_message=False)
+
+    def receive_selected(self, accept, business_type="*", auto_confirm=False, confirm_rejected=False):
+        """Peeks the next message and calls accept(receivedMessage) with its header (messageID, senderCode, businessType, baMessageID, ...).
+           Content is downloaded only if accept returns True. Returns (receive_message result, accepted).
+           A rejected message is returned header only and stays on the server for another worker to download, unless
+           'confirm_rejected' is True, which confirms it without ever downloading the payload.
+           If another consumer took the peeked message before the download, the message downloaded instead is checked with
+           accept and returned with its content either way, it is not downloaded a second time."""
+
+        received_message = self.peek_message(business_type)
+        header = received_message.receivedMessage
+
+        if header is None:
+            return received_message, False
+
+        if accept(header):
+            received_message = self.receive_message(business_type)
+            message = received_message.receivedMessage
+
+            if message is None:
+                return received_message, False
+
+            if message.messageID == header.messageID or accept(message):
+                if auto_confirm:
+                    self.confirm_received_message(message.messageID)
+                return received_message, True
+
+            header = message  # Downloaded instead of the peeked one and rejected
+
+        if confirm_rejected:
+            self.confirm_received_message(header.messageID)
+
+        return received_message, False
+
+    def drain(self, business_type="*", confirm="after_process"):
+        """Generator that yields receive_message results while remainingMessagesCount > 0 or until the queue is empty.
+           Confirmation of message N runs in a background thread, overlapping with the receive of message N+1.
+           confirm="after_process" - at-least-once, a message is confirmed only when the caller asks for the next one, so a crash
+                                     or break while processing leaves it on the server for redelivery.
+           confirm="on_receive"    - at-most-once, a message is confirmed as soon as it is received, while the caller processes it.
+           confirm=None            - no confirmation, caller must use confirm_received_message. Draining stops if the server hands
+                                     out the previous message again because it was not confirmed.
+           Errors from background confirmations are raised from the generator. If the server hands out a message again because its
+           confirmation has not been processed yet (it offers the oldest unconfirmed message), the generator notices it and from then
+           on waits for each confirmation before the next receive, so at most one payload per drain is downloaded twice."""
+
+        if confirm not in ("after_process", "on_receive", None):
+            raise ValueError(f"Unknown confirm mode {confirm!r}, use 'after_process', 'on_receive' or None")
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+
+            pending_id, pending = None, None
+            previous_id = None
+            remaining = True
+            head_of_line = False  # Learned: server offers the unconfirmed message again instead of the next one
+
+            while remaining:
+
+                if head_of_line and pending is not None:
+                    pending.result()
+                    pending_id, pending = None, None
+
+                received_message = self.receive_message(business_type)
+                message = received_message.receivedMessage
+
+                if pending is not None:
+                    pending.result()  # Raise confirmation errors and keep at most one in flight
+
+                    if message is not None and message.messageID == pending_id:
+                        pending_id, pending = None, None
+                        head_of_line = True
+                        continue  # Redelivered before confirmation was processed, ask again
+
+                    pending_id, pending = None, None
+
+                if message is None or (confirm is None and message.messageID == previous_id):
+                    break
+
+                previous_id = message.messageID
+                remaining = received_message.remainingMessagesCount
+
+                if confirm == "on_receive":
+                    pending_id, pending = message.messageID, executor.submit(self.confirm_received_message, message.messageID)
+
+                yield received_message
+
+                if confirm == "after_process":
+                    pending_id, pending = message.messageID, executor.submit(self.confirm_received_message, message.messageID)
+
+            if pending is not None:
+                pending.result()
+
     def confirm_received_message(self, message_id):
         """ConfirmReceiveMessage(messageID: xsd:string) -> messageID: xsd:string"""
 
-        message_id = self.service.ConfirmReceiveMessage(message_id)
+        with self.instrumentation.operation("confirm_received_message", messageID=message_id):
+            message_id = self.service.ConfirmReceiveMessage(message_id)
 
         return message_id
 
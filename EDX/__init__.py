@@ -1,4 +1,48 @@
-from EDX.MADES_SOAP_API import create_client
-from ._version import get_versions
-__version__ = get_versions()['version']
-del get_versions
+import importlib
+
+try:
+    # Written by setup.py at build time, never spawns git like _version.get_versions() may
+    from ._build_version import version as __version__
+except ImportError:
+    pass  # Resolved from installed package metadata on first access
+
+# Public names and the modules they live in, imported on first access so "import EDX" stays cheap
+_lazy_attributes = {"Client": "EDX.MADES_SOAP_API",
+                    "create_client": "EDX.MADES_SOAP_API",
+                    "AsyncClient": "EDX.async_client",
+                    "StatusTracker": "EDX.status",
+                    "ReceivePoller": "EDX.polling",
+                    "WeightedPoller": "EDX.polling",
+                    "Prefetcher": "EDX.polling",
+                    "Inbox": "EDX.inbox",
+                    "Outbox": "EDX.outbox",
+                    "Dispatcher": "EDX.dispatch",
+                    "MetricsRegistry": "EDX.metrics",
+                    "Tracer": "EDX.tracing"}
+
+__all__ = list(_lazy_attributes)
+
+
+def __getattr__(name):
+
+    if name in _lazy_attributes:
+        value = getattr(importlib.import_module(_lazy_attributes[name]), name)
+
+    elif name == "__version__":
+        from importlib import metadata
+        try:
+            value = metadata.version(__name__)
+        except metadata.PackageNotFoundError:
+            value = "0+unknown"
+
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # Cache as plain module attribute, __getattr__ is not called for it again
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | {"__version__"})
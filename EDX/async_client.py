@@ -0,0 +1,133 @@
+#-------------------------------------------------------------------------------
+# Name:        async_client
+# Purpose:     asyncio EDX MADES SOAP client on a shared httpx connection pool
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+from zeep import AsyncClient as AsyncSOAPClient
+from zeep.proxy import AsyncServiceProxy
+from zeep.transports import AsyncTransport
+
+from EDX.cache import load_document
+from EDX.MADES_SOAP_API import BUNDLED_WSDL
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class AsyncClient:
+    """
+    asyncio counterpart of EDX.Client. Operations are coroutines running on an httpx.AsyncClient, so many
+    conversations can be in flight on one event loop without a thread per call.
+
+    Args:
+        server (str): The server address or IP where the web service is hosted. This parameter is mandatory.
+        username (str, optional): The username for HTTP basic authentication. Defaults to None.
+        password (str, optional): The password for HTTP basic authentication. Defaults to None.
+        verify (bool/str, optional): Flag to enable SSL verification or a path to a CA_BUNDLE file. Defaults to False.
+        auth (httpx.Auth, optional): Custom HTTP authentication mechanism supported by httpx. Defaults to None.
+        wsse (zeep.wsse.WSSE, optional): Web Service Security object to add security tokens to SOAP messages. Defaults to None.
+        offline (bool, optional): Build the service from the WSDL bundled with the package instead of downloading it. Defaults to False.
+        max_connections (int, optional): Maximum number of connections in the pool. Defaults to 100.
+        max_keepalive_connections (int, optional): Maximum number of idle keep-alive connections. Defaults to 20.
+        timeout (int/float, optional): Timeout in seconds for operation calls. Defaults to 300.
+        http_client (httpx.AsyncClient, optional): Existing client to share one connection pool between several AsyncClients.
+            Its auth, verify and limits are used as they are and it is not closed by aclose(). Defaults to None.
+
+    Notes:
+        - If both 'username' and 'auth' are given, 'auth' is used, like in Client.
+        - Loading the WSDL is synchronous, create the client before entering hot paths or use offline=True.
+        - Use "async with AsyncClient(...) as service:" or call "await service.aclose()" to release connections.
+        - Requires httpx, install with "pip install EDX[async]".
+    """
+
+    def __init__(self, server, username=None, password=None, verify=False, auth=None, wsse=None, offline=False,
+                 max_connections=100, max_keepalive_connections=20, timeout=300, http_client=None):
+
+        if httpx is None:
+            raise RuntimeError("To use AsyncClient, install EDX with the async extras, e.g., `pip install EDX[async]`")
+
+        wsdl = BUNDLED_WSDL if offline else f'{server}/ws/madesInWSInterface.wsdl'
+
+        # Same precedence as Client, 'auth' wins over 'username'
+        if username and not auth:
+            auth = httpx.BasicAuth(username, password)
+
+        self._close_http_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(
+            auth=auth,
+            verify=verify,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections))
+
+        wsdl_client = httpx.Client(auth=auth, verify=verify, timeout=timeout)
+        transport = AsyncTransport(client=self.http_client, wsdl_client=wsdl_client)
+        self.transport = transport
+
+        # Create SOAP client
+        try:
+            if offline:
+                wsdl = load_document(wsdl, transport)
+
+            client = AsyncSOAPClient(wsdl, transport=transport, wsse=wsse)
+        finally:
+            wsdl_client.close()
+
+        self.address = f'{server}/ws/madesInWSInterface'
+        self.service = AsyncServiceProxy(client,
+                                         client.wsdl.bindings['{http://mades.entsoe.eu/}MadesEndpointSOAP12'],
+                                         address=self.address)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type=None, exc_value=None, traceback=None):
+        await self.aclose()
+
+    async def aclose(self):
+        """Closes the connection pool, unless it was passed in as http_client"""
+
+        if self._close_http_client:
+            await self.http_client.aclose()
+
+    async def connectivity_test(self, reciver_EIC, business_type):
+        """ConnectivityTest(receiverCode: xsd:string, businessType: xsd:string) -> messageID: xsd:string"""
+
+        message_id = await self.service.ConnectivityTest(reciver_EIC, business_type)
+
+        return message_id
+
+    async def send_message(self, receiver_EIC, business_type, content, sender_EIC="", ba_message_id="", conversation_id=""):
+        """SendMessage(message: ns0:SentMessage, conversationID: xsd:string) -> messageID: xsd:string
+           ns0:SentMessage(receiverCode: xsd:string, businessType: xsd:string, content: xsd:base64Binary, senderApplication: xsd:string, baMessageID: xsd:string)"""
+
+        message_dic = {"receiverCode": receiver_EIC, "businessType": business_type, "content": content, "senderApplication": sender_EIC, "baMessageID": ba_message_id}
+        message_id  = await self.service.SendMessage(message_dic, conversation_id)
+
+        return message_id
+
+    async def check_message_status(self, message_id):
+        """CheckMessageStatus(messageID: xsd:string) -> messageStatus: ns0:MessageStatus"""
+
+        status = await self.service.CheckMessageStatus(message_id)
+
+        return status
+
+    async def receive_message(self, business_type="*", download_message=True, auto_confirm=False):
+        """ReceiveMessage(businessType: xsd:string, downloadMessage: xsd:boolean) -> receivedMessage: ns0:ReceivedMessage, remainingMessagesCount: xsd:long"""
+
+        received_message = await self.service.ReceiveMessage(business_type, download_message)
+
+        if auto_confirm and received_message.receivedMessage is not None:
+            await self.confirm_received_message(received_message.receivedMessage.messageID)
+
+        return received_message
+
+    async def confirm_received_message(self, message_id):
+        """ConfirmReceiveMessage(messageID: xsd:string) -> messageID: xsd:string"""
+
+        message_id = await self.service.ConfirmReceiveMessage(message_id)
+
+        return message_id
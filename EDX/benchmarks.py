@@ -0,0 +1,186 @@
+#-------------------------------------------------------------------------------
+# Name:        benchmarks
+# Purpose:     Runnable benchmarks of the EDX package, "python -m EDX.benchmarks <name>"
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import argparse
+import base64
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Every run is a fresh interpreter, so nothing is already in sys.modules
+IMPORT_TIME = "import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+
+IMPORT_STATEMENTS = {
+    "import EDX": "import EDX",
+    "eager (EDX before lazy imports)": "import EDX.MADES_SOAP_API; from EDX._version import get_versions; get_versions()",
+    "import EDX; EDX.Client": "import EDX; EDX.Client",
+}
+
+
+def import_time(runs=10):
+    """
+    Time of "import EDX" against importing what EDX/__init__.py imported eagerly before (MADES_SOAP_API with zeep,
+    lxml and requests, plus versioneer get_versions() that may spawn git), each in a fresh interpreter.
+
+    Returns dict of {label: [seconds of each run]}
+    """
+
+    results = {}
+
+    for label, statement in IMPORT_STATEMENTS.items():
+        results[label] = [float(subprocess.check_output([sys.executable, "-c", IMPORT_TIME.format(statement=statement)]))
+                          for _ in range(runs)]
+
+    return results
+
+
+def _print_import_time(args):
+
+    for label, seconds in import_time(args.runs).items():
+        print(f"{label:34} min {min(seconds) * 1000:8.1f} ms  median {statistics.median(seconds) * 1000:8.1f} ms")
+
+
+def _canned_responses():
+    """Response body per request element name, for engine_call_time"""
+
+    from EDX.fast_path import MADES_NS
+
+    return {
+        b"SendMessageRequest": f'<ns:SendMessageResponse xmlns:ns="{MADES_NS}"><ns:messageID>1</ns:messageID></ns:SendMessageResponse>',
+        b"ReceiveMessageRequest": (f'<ns:ReceiveMessageResponse xmlns:ns="{MADES_NS}"><ns:receivedMessage><ns:messageID>1</ns:messageID>'
+                                   '<ns:receiverCode>R</ns:receiverCode><ns:senderCode>S</ns:senderCode><ns:businessType>RIMD</ns:businessType>'
+                                   f'<ns:content>{base64.b64encode(bytes(100_000)).decode()}</ns:content></ns:receivedMessage>'
+                                   '<ns:remainingMessagesCount>0</ns:remainingMessagesCount></ns:ReceiveMessageResponse>'),
+        b"CheckMessageStatusRequest": (f'<ns:CheckMessageStatusResponse xmlns:ns="{MADES_NS}"><ns:messageStatus><ns:messageID>1</ns:messageID>'
+                                       '<ns:state>DELIVERED</ns:state><ns:receiverCode>R</ns:receiverCode><ns:senderCode>S</ns:senderCode>'
+                                       '<ns:businessType>RIMD</ns:businessType><ns:sendTimestamp>2024-01-01T00:00:00Z</ns:sendTimestamp>'
+                                       '</ns:messageStatus></ns:CheckMessageStatusResponse>'),
+    }
+
+
+def engine_call_time(number=200, repeat=3):
+    """
+    Seconds per call of send_message (100 kB content), receive_message (100 kB content) and check_message_status with the
+    "zeep" and the "fast" engine. Every request is answered in process with a canned response, so only envelope build and
+    response parse are measured, no network.
+
+    Returns dict of {(engine, call name): seconds per call, best of 'repeat' runs of 'number' calls}
+    """
+
+    import timeit
+    from requests import Response
+    from requests.adapters import BaseAdapter
+    from EDX.MADES_SOAP_API import Client
+    from EDX.fast_path import ENVELOPE_END, ENVELOPE_START
+
+    responses = _canned_responses()
+
+    class CannedAdapter(BaseAdapter):
+        """Answers every POST with a canned response for the requested operation"""
+
+        def send(self, request, **kwargs):
+            response = Response()
+            response.status_code = 200
+            response.headers["Content-Type"] = "application/soap+xml; charset=utf-8"
+            response._content = ENVELOPE_START + next(responses[name] for name in responses if name in request.body).encode() + ENVELOPE_END
+            response.request = request
+            return response
+
+        def close(self):
+            pass
+
+    results = {}
+
+    for engine in ("zeep", "fast"):
+
+        service = Client("http://canned", offline=True, engine=engine)
+        service.session.mount("http://canned", CannedAdapter())
+
+        for name, call in {"send_message": lambda: service.send_message("R", "RIMD", bytes(100_000)),
+                           "receive_message": lambda: service.receive_message("RIMD"),
+                           "check_message_status": lambda: service.check_message_status("1")}.items():
+            results[engine, name] = min(timeit.repeat(call, number=number, repeat=repeat)) / number
+
+    return results
+
+
+def _print_engine_call_time(args):
+
+    for (engine, name), seconds in engine_call_time(args.number, args.repeat).items():
+        print(f"{engine:5} {name:21} {seconds * 1e6:10.1f} us/call")
+
+
+def thread_throughput(threads=32, calls=320, delay=0.05, pool_maxsize=10, pool_block=False, engine="zeep", debug=False):
+    """
+    send_message calls per second of one Client shared by 'threads' threads, against a local StandinServer that answers
+    every call after 'delay' seconds. With pool_block=True at most pool_maxsize calls are in flight at a time.
+
+    Returns dict with calls_per_second, seconds and connections (TCP connections opened to the server)
+
+    Notes:
+        - Needs a source checkout, the stand-in server is tests/standin.py. Run from the repository root.
+    """
+
+    from EDX.MADES_SOAP_API import Client
+
+    try:
+        from tests.standin import StandinServer
+    except ImportError as error:
+        raise RuntimeError("The threads benchmark needs tests/standin.py, run it from the root of a source checkout") from error
+
+    with StandinServer(delay=delay) as server:
+        service = Client(server.url, offline=True, engine=engine, debug=debug, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        service.send_message("10V000000000011Q", "RIMD", b"warm-up")
+
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(lambda index: service.send_message("10V000000000011Q", "RIMD", b"<schedule/>"), range(calls)))
+
+        seconds = time.perf_counter() - start
+        connections = server.connections
+
+    return {"calls_per_second": calls / seconds, "seconds": seconds, "connections": connections}
+
+
+def _print_thread_throughput(args):
+
+    print(f"{args.threads} threads, {args.calls} send_message calls, {args.delay * 1000:.0f} ms server latency, engine={args.engine}")
+
+    for pool_maxsize in args.pool_maxsize:
+        for pool_block in (False, True):
+            result = thread_throughput(args.threads, args.calls, args.delay, pool_maxsize, pool_block, args.engine, args.debug)
+            print(f"pool_maxsize={pool_maxsize:<4} pool_block={pool_block!s:5}  {result['calls_per_second']:8.1f} calls/s  "
+                  f"{result['connections']:4} connections")
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(prog="python -m EDX.benchmarks")
+    commands = parser.add_subparsers(dest="benchmark", required=True)
+
+    command = commands.add_parser("import_time", help="Import time of the EDX package, lazy vs eager")
+    command.add_argument("--runs", type=int, default=10)
+    command.set_defaults(run=_print_import_time)
+
+    command = commands.add_parser("engines", help="Time per call of the zeep and fast engines on canned responses, no network")
+    command.add_argument("--number", type=int, default=200, help="Calls per run")
+    command.add_argument("--repeat", type=int, default=3, help="Runs, the best one is reported")
+    command.set_defaults(run=_print_engine_call_time)
+
+    command = commands.add_parser("threads", help="Throughput of one Client shared by many threads against a local stand-in server")
+    command.add_argument("--threads", type=int, default=32)
+    command.add_argument("--calls", type=int, default=320)
+    command.add_argument("--delay", type=float, default=0.05, help="Server latency in seconds")
+    command.add_argument("--pool-maxsize", type=int, nargs="+", default=[10, 32])
+    command.add_argument("--engine", choices=["zeep", "fast"], default="zeep")
+    command.add_argument("--debug", action="store_true", help="Capture exchanges in Client.history")
+    command.set_defaults(run=_print_thread_throughput)
+
+    args = parser.parse_args()
+    args.run(args)
@@ -0,0 +1,228 @@
+#-------------------------------------------------------------------------------
+# Name:        cache
+# Purpose:     Persistent on-disk cache for MADES WSDL and XSD documents
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import closing
+from urllib.parse import urlparse
+
+from zeep.transports import Transport
+from zeep.wsdl import Document
+
+# Parsed WSDL documents shared between clients of the same process, keyed by (url, sha256 of content, settings),
+# each stored with the sha256 of every document imported while it was parsed
+_parsed_documents = {}
+_parsed_documents_lock = threading.Lock()
+
+
+class WSDLCache:
+    """
+    On-disk cache for WSDL and XSD documents downloaded from the EDX toolbox.
+
+    Every document is stored as two files named after the sha256 of its url: the raw content and a small
+    json file with the content hash, fetch time and HTTP validators (ETag, Last-Modified). Content whose
+    hash does not match the stored one is treated as missing, so a truncated or edited file is never used.
+
+    Args:
+        directory (str, optional): Directory where documents are stored. Defaults to "~/.cache/EDX/wsdl".
+        ttl (int/float, optional): Seconds a cached document is used without asking the server. After that it
+            is revalidated with a conditional GET. None means never revalidate. Defaults to 86400 (one day).
+    """
+
+    def __init__(self, directory=None, ttl=86400):
+        self.directory = os.path.expanduser(directory or os.path.join("~", ".cache", "EDX", "wsdl"))
+        self.ttl = ttl
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.directory, f"{key}.xml"), os.path.join(self.directory, f"{key}.json")
+
+    def _write(self, path, data):
+        """Write atomically, so concurrent workers never see a partial file"""
+        handle, temp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(handle, "wb") as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def get(self, url):
+        """Returns cache entry dict with 'content', 'sha256', 'fetched', 'etag' and 'last_modified' or None"""
+
+        content_path, meta_path = self._paths(url)
+
+        try:
+            with open(meta_path, "rb") as meta_file:
+                entry = json.load(meta_file)
+            with open(content_path, "rb") as content_file:
+                content = content_file.read()
+        except (OSError, ValueError):
+            return None
+
+        if hashlib.sha256(content).hexdigest() != entry.get("sha256"):
+            return None
+
+        entry["content"] = content
+        return entry
+
+    def add(self, url, content, etag=None, last_modified=None):
+        """Store content of url, returns the new cache entry"""
+
+        content_path, meta_path = self._paths(url)
+        entry = {"url": url,
+                 "sha256": hashlib.sha256(content).hexdigest(),
+                 "fetched": time.time(),
+                 "etag": etag,
+                 "last_modified": last_modified}
+
+        self._write(content_path, content)
+        self._write(meta_path, json.dumps(entry).encode())
+
+        entry["content"] = content
+        return entry
+
+    def touch(self, url, entry):
+        """Mark entry as freshly validated without rewriting its content"""
+
+        entry = dict(entry, fetched=time.time())
+        meta = {key: value for key, value in entry.items() if key != "content"}
+        self._write(self._paths(url)[1], json.dumps(meta).encode())
+        return entry
+
+    def is_fresh(self, entry):
+        return self.ttl is None or time.time() - entry["fetched"] < self.ttl
+
+
+class CachingTransport(Transport):
+    """
+    zeep Transport that loads WSDL and XSD documents through a WSDLCache.
+
+    Fresh entries are served from disk without network access, stale ones are revalidated with
+    If-None-Match/If-Modified-Since and only downloaded again when the server reports a change.
+    A document is validated at most once per transport, so loading it repeatedly during one
+    client construction never costs extra round-trips.
+    """
+
+    def __init__(self, wsdl_cache, **kwargs):
+        super().__init__(**kwargs)
+        self.wsdl_cache = wsdl_cache
+        self._validated = {}
+
+    def load(self, url):
+        if not url or urlparse(url).scheme not in ("http", "https"):
+            return super().load(url)
+
+        if url in self._validated:
+            return self._validated[url]
+
+        entry = self.wsdl_cache.get(url)
+
+        if entry and self.wsdl_cache.is_fresh(entry):
+            self._validated[url] = entry["content"]
+            return entry["content"]
+
+        return self.revalidate(url, entry)
+
+    def revalidate(self, url, entry=None):
+        """Conditional GET of url, updates the cache and returns the current content"""
+
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        self.logger.debug("Revalidating cached data from: %s", url)
+        response = self.session.get(url, headers=headers, timeout=self.load_timeout)
+
+        with closing(response):
+            if entry and response.status_code == 304:
+                entry = self.wsdl_cache.touch(url, entry)
+            else:
+                response.raise_for_status()
+                entry = self.wsdl_cache.add(url, response.content,
+                                            etag=response.headers.get("ETag"),
+                                            last_modified=response.headers.get("Last-Modified"))
+
+        self._validated[url] = entry["content"]
+        return entry["content"]
+
+
+class _DocumentLoader:
+    """
+    Stands in for the client transport while a shared Document is parsed. zeep keeps the transport it parsed with in
+    the Document and in every Schema, so after parsing the reference is dropped and the shared Document does not keep
+    the session, auth and connection pool of the first client alive. The sha256 of every loaded document is kept in
+    'loaded', so a change of an imported XSD is noticed as well as a change of the WSDL.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.loaded = {}
+
+    def load(self, url):
+
+        if self.transport is None:
+            raise RuntimeError(f"Shared WSDL document can not load {url} after it was parsed")
+
+        content = self.transport.load(url)
+        self.loaded[url] = hashlib.sha256(content).hexdigest()
+
+        return content
+
+    def detach(self):
+        self.transport = None
+
+
+def _settings_key(settings):
+    """Values of zeep Settings fields, cached documents are shared only between clients with equal settings"""
+
+    if settings is None:
+        return None
+
+    return repr([(name, getattr(settings, name)) for name in type(settings).__slots__ if not name.startswith("_")])
+
+
+def _imports_unchanged(imports, transport):
+    """True if every document imported by a parsed WSDL still has the same content, loaded (and revalidated) through transport"""
+
+    return all(hashlib.sha256(transport.load(url)).hexdigest() == sha256 for url, sha256 in imports.items())
+
+
+def load_document(wsdl, transport, settings=None):
+    """Returns parsed zeep WSDL Document, reusing an already parsed one if the WSDL, its imported documents and the settings
+       have not changed"""
+
+    content = transport.load(wsdl)
+    key = (wsdl, hashlib.sha256(content).hexdigest(), _settings_key(settings))
+
+    with _parsed_documents_lock:
+        imports, document = _parsed_documents.get(key, (None, None))
+
+    if document is not None and _imports_unchanged(imports, transport):
+        return document
+
+    loader = _DocumentLoader(transport)
+
+    try:
+        document = Document(wsdl, loader, settings=settings)
+    finally:
+        loader.detach()
+
+    imports = {url: sha256 for url, sha256 in loader.loaded.items() if url != wsdl}
+
+    with _parsed_documents_lock:
+        _parsed_documents[key] = (imports, document)
+
+    return document
@@ -0,0 +1,214 @@
+#-------------------------------------------------------------------------------
+# Name:        capture
+# Purpose:     Bounded, sampled capture of raw HTTP exchanges for debugging
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from lxml import etree
+
+from EDX.large_messages import huge_tree_parser
+
+# Opening tag of the base64 payload element, with any namespace prefix
+CONTENT_TAG = re.compile(rb"<((?:[\w.-]+:)?content)(?:\s[^>]*)?>")
+
+
+def shrink(body, max_payload=1024, max_body=65536, hash_payload=True):
+    """
+    Returns body with the text of its content element cut to max_payload bytes and the whole body cut to max_body bytes.
+    A cut payload is followed by a marker with its full size and, if hash_payload, its sha256, so it can still be matched
+    to a file. Bodies within the limits are returned as they are, without a copy.
+    """
+
+    if len(body) <= max_payload:
+        return body
+
+    match = CONTENT_TAG.search(body)
+
+    if match:
+        start = match.end()
+        end = body.find(b"</" + match.group(1) + b">", start)
+
+        if end - start > max_payload:
+            payload = memoryview(body)[start:end]
+            marker = f"...[{len(payload)} bytes" + (f" sha256={hashlib.sha256(payload).hexdigest()}" if hash_payload else "") + "]"
+            body = b"".join((body[:start + max_payload], marker.encode(), body[end:]))
+
+    if len(body) > max_body:
+        body = body[:max_body] + f"...[{len(body) - max_body} more bytes]".encode()
+
+    return body
+
+
+class Exchange:
+    """
+    One captured HTTP request and response. Bodies are kept as shrunk bytes and decoded or parsed only when asked for.
+
+    Attributes:
+        time (float): Wall clock time the response arrived, seconds since the epoch.
+        method (str), url (str), status_code (int): Request line and response status.
+        elapsed (float): Seconds until the response headers arrived.
+        request_headers, response_headers (dict): HTTP headers.
+        request_body, response_body (bytes): Shrunk bodies, None for streamed bodies.
+        request_size, response_size (int): Original body sizes in bytes, None if not known.
+    """
+
+    def __init__(self, response):
+        request = response.request
+        self.time = time.time()
+        self.method = request.method
+        self.url = request.url
+        self.status_code = response.status_code
+        self.elapsed = response.elapsed.total_seconds()
+        self.request_headers = request.headers
+        self.response_headers = response.headers
+        self.request_body = None
+        self.response_body = None
+        self.request_size = None
+        self.response_size = None
+
+    def request_text(self, pretty=False):
+        """Returns the request body as text, pretty printed if it is XML and pretty is True"""
+
+        return _text(self.request_body, pretty)
+
+    def response_text(self, pretty=False):
+        """Returns the response body as text, pretty printed if it is XML and pretty is True"""
+
+        return _text(self.response_body, pretty)
+
+    @property
+    def request_envelope(self):
+        """Request body parsed with lxml, None if not captured or not XML"""
+
+        return _parse(self.request_body)
+
+    @property
+    def response_envelope(self):
+        """Response body parsed with lxml, None if not captured or not XML (e.g. multipart)"""
+
+        return _parse(self.response_body)
+
+    def __repr__(self):
+        return f"Exchange({self.method} {self.url} {self.status_code}, {self.elapsed * 1000:.1f} ms, request_size={self.request_size}, response_size={self.response_size})"
+
+
+def _text(body, pretty):
+
+    if body is None:
+        return "[streamed body not captured]"
+
+    if pretty:
+        envelope = _parse(body)
+        if envelope is not None:
+            return etree.tostring(envelope, pretty_print=True).decode()
+
+    return body.decode("utf-8", "replace")
+
+
+def _parse(body):
+
+    if body is None:
+        return None
+
+    try:
+        return etree.fromstring(body, huge_tree_parser)
+    except etree.XMLSyntaxError:
+        return None
+
+
+class ExchangeCapture:
+    """
+    Keeps the last 'maxlen' HTTP exchanges of each thread in a ring buffer, with payloads cut down, for debugging.
+
+    Used by Client(debug=True) instead of zeep's HistoryPlugin: it works on raw bytes from a requests response hook,
+    so nothing is parsed or pretty printed unless asked for, every engine and the streaming calls are covered, and
+    memory stays bounded however large the messages are. With sample_rate below 1 only that share of exchanges is
+    captured, so capture can stay enabled in production.
+
+    Args:
+        maxlen (int, optional): Exchanges kept per thread. Defaults to 10.
+        sample_rate (float, optional): Share of exchanges captured, 0..1. Defaults to 1.
+        max_payload (int, optional): Bytes of the base64 content element kept. Defaults to 1024.
+        max_body (int, optional): Bytes of each body kept after cutting the payload. Defaults to 65536.
+        hash_payload (bool, optional): Add sha256 of a cut payload to its marker. Defaults to True.
+
+    Notes:
+        - exchanges() and last() see only exchanges made on the calling thread.
+        - last_sent and last_received give {"envelope": ..., "http_headers": ...} like HistoryPlugin, parsed on access.
+    """
+
+    def __init__(self, maxlen=10, sample_rate=1, max_payload=1024, max_body=65536, hash_payload=True):
+        self.maxlen = maxlen
+        self.sample_rate = sample_rate
+        self.max_payload = max_payload
+        self.max_body = max_body
+        self.hash_payload = hash_payload
+        self._local = threading.local()
+
+    @property
+    def _buffer(self):
+        try:
+            return self._local.buffer
+        except AttributeError:
+            self._local.buffer = deque([], self.maxlen)
+            return self._local.buffer
+
+    def exchanges(self):
+        """Returns captured exchanges of this thread, oldest first"""
+
+        return list(self._buffer)
+
+    def last(self):
+        """Returns the last captured exchange of this thread or None"""
+
+        buffer = self._buffer
+        return buffer[-1] if buffer else None
+
+    def clear(self):
+        self._buffer.clear()
+
+    @property
+    def last_sent(self):
+        exchange = self.last()
+        return {"envelope": exchange.request_envelope, "http_headers": exchange.request_headers} if exchange else None
+
+    @property
+    def last_received(self):
+        exchange = self.last()
+        return {"envelope": exchange.response_envelope, "http_headers": exchange.response_headers} if exchange else None
+
+    def hook(self, response, *args, **kwargs):
+        """requests response hook recording the exchange"""
+
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return response
+
+        exchange = Exchange(response)
+        body = response.request.body
+
+        if isinstance(body, str):
+            body = body.encode()
+
+        if isinstance(body, bytes):
+            exchange.request_size = len(body)
+            exchange.request_body = shrink(body, self.max_payload, self.max_body, self.hash_payload)
+        elif response.request.headers.get("Content-Length"):
+            exchange.request_size = int(response.request.headers["Content-Length"])
+
+        if kwargs.get("stream"):
+            length = response.headers.get("Content-Length")
+            exchange.response_size = int(length) if length is not None else None
+        else:
+            exchange.response_size = len(response.content)
+            exchange.response_body = shrink(response.content, self.max_payload, self.max_body, self.hash_payload)
+
+        self._buffer.append(exchange)
+
+        return response
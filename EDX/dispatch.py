@@ -0,0 +1,277 @@
+#-------------------------------------------------------------------------------
+# Name:        dispatch
+# Purpose:     Route received messages by business type and sender to handler worker pools
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class Route:
+    """Handler with its filters and own worker pool, created by Dispatcher.register()"""
+
+    def __init__(self, handler, business_type, sender, workers, max_queue, processes):
+        self.handler = handler
+        self.business_type = business_type
+        self.sender = sender
+        self.max_queue = max_queue
+        self.pending = 0  # Messages submitted to the pool and not finished yet
+
+        if processes:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"EDX-route-{business_type or 'any'}")
+
+    @property
+    def full(self):
+        return self.pending >= self.max_queue
+
+    def accepts_business_type(self, business_type):
+        return business_type == "*" or self.business_type in (None, business_type)
+
+    def matches(self, message):
+        return self.business_type in (None, message.businessType) and self.sender in (None, message.senderCode)
+
+
+class Dispatcher:
+    """
+    Receives messages and hands each one to the handler registered for its businessType and sender.
+
+    Every route has its own thread (or process) pool and queue bound, so a slow handler only holds back messages
+    of its own route. Business types with a dedicated route are polled separately, and a business type is not
+    polled while all routes that could take it are full. The receive loop never waits for a route: a message whose
+    route is full is left unconfirmed and received again later. A message is confirmed after its handler returned;
+    if the handler raises, on_error is called and the message is left unconfirmed and handed to the handler again
+    after 'retry_interval', multiplied by 'backoff' after each further failure, up to 'max_attempts' calls in total.
+    After the last failed attempt the message is passed to dead_letter and confirmed, or without dead_letter left
+    unconfirmed and not dispatched again by this Dispatcher.
+
+    Args:
+        client (EDX.Client): Client used for receive_message and confirm_received_message, shared by all routes.
+        min_interval (float, optional): Seconds to wait after a round of polls when the queues are empty. Defaults to 1.
+        max_interval (float, optional): Upper bound for seconds between rounds while nothing arrives. Defaults to 60.
+        backoff (float, optional): Interval multiplier after a round without messages. Defaults to 2.
+        on_error (callable, optional): Called as on_error(received_message, error) when a handler or the confirm fails,
+            or with a LookupError when no route matches a message.
+        max_attempts (int, optional): Handler calls for one message before it is given up. Defaults to 3.
+        retry_interval (float, optional): Seconds before a message whose handler failed is dispatched again. Defaults to 1.
+        dead_letter (callable, optional): Called as dead_letter(received_message, error) with a message given up after
+            max_attempts, e.g. to store it for inspection. The message is confirmed once it returns. Defaults to None.
+
+    Notes:
+        - Routes are matched in registration order, register a catch-all route (no filters) last to receive everything else.
+        - With a catch-all route "*" is polled as well, and business types first seen through it are then also polled
+          on their own, so their messages are reached while "*" keeps returning a message of a full route.
+        - A message no route matches is left unconfirmed and reported to on_error once, dispatching goes on.
+        - On a server that returns the oldest unconfirmed message again, a message given up without dead_letter blocks the
+          business types it is returned for until it is confirmed elsewhere.
+        - Handlers are called with the receive_message result. With processes=True the handler must be a module level
+          function, it and the message are pickled to the worker process.
+        - stop() may be called from any thread, run() then waits for queued messages to be handled and confirmed.
+    """
+
+    def __init__(self, client, min_interval=1, max_interval=60, backoff=2, on_error=None, max_attempts=3, retry_interval=1, dead_letter=None):
+
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.on_error = on_error
+        self.max_attempts = max_attempts
+        self.retry_interval = retry_interval
+        self.dead_letter = dead_letter
+
+        self.routes = []
+        self.interval = min_interval
+        self._in_flight = set()  # messageIDs being handled, the server returns them again until confirmed
+        self._unmatched = set()  # messageIDs already reported to on_error as not matching any route
+        self._failures = {}  # messageID to (failed handler calls, time.monotonic() of the next attempt) until handled
+        self._seen_business_types = {}  # Business types received through "*", in order
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+
+    def register(self, handler, business_type=None, sender=None, workers=1, max_queue=None, processes=False):
+        """Adds a route calling handler(received_message) for messages of business_type from sender (None matches any),
+           with its own pool of 'workers' threads or processes and at most 'max_queue' (default 2 * workers) messages
+           waiting or in progress. Returns the Route."""
+
+        route = Route(handler, business_type, sender, workers, max_queue or 2 * workers, processes)
+        self.routes.append(route)
+
+        return route
+
+    def route(self, business_type=None, sender=None, workers=1, max_queue=None, processes=False):
+        """Decorator form of register()"""
+
+        def decorator(handler):
+            self.register(handler, business_type, sender, workers, max_queue, processes)
+            return handler
+
+        return decorator
+
+    def stop(self):
+        self._stopped.set()
+
+        with self._condition:
+            self._condition.notify_all()
+
+    @property
+    def stopped(self):
+        return self._stopped.is_set()
+
+    def business_types(self):
+        """Business types polled in each round: those of dedicated routes and, when a route has no business type
+           filter, those seen through "*" and "*" itself"""
+
+        business_types = [route.business_type for route in self.routes if route.business_type is not None]
+
+        if any(route.business_type is None for route in self.routes):
+            business_types += list(self._seen_business_types) + ["*"]
+
+        return list(dict.fromkeys(business_types))
+
+    def run(self):
+        """Receives and dispatches messages until stop(), then waits for all routes to finish"""
+
+        if not self.routes:
+            raise ValueError("No routes registered")
+
+        try:
+            while not self.stopped:
+                polled = False
+                received_any = False
+                remaining = 0
+
+                for business_type in self.business_types():
+
+                    with self._condition:
+                        if all(route.full for route in self.routes if route.accepts_business_type(business_type)):
+                            continue
+
+                    polled = True
+                    received_message = self.client.receive_message(business_type)
+                    message = received_message.receivedMessage
+
+                    if message is None:
+                        continue
+
+                    if business_type == "*":
+                        self._seen_business_types.setdefault(message.businessType, None)
+
+                    if not self._dispatch(received_message):
+                        continue
+
+                    received_any = True
+                    remaining += received_message.remainingMessagesCount or 0
+
+                if not polled:
+                    delay = self.max_interval  # All routes full, woken up when one finishes a message
+                elif received_any:
+                    self.interval = self.min_interval
+                    delay = 0 if remaining else self.min_interval
+                else:
+                    delay = self.interval
+                    self.interval = min(self.interval * self.backoff, self.max_interval)
+
+                self._wait(delay)
+
+        finally:
+            for route in self.routes:
+                route.executor.shutdown(wait=True)
+
+    def _wait(self, delay):
+        """Sleeps until delay passed, stop() or a route finished a message while some route was full"""
+
+        if not delay:
+            return
+
+        with self._condition:
+            self._condition.wait(delay)
+
+    def _dispatch(self, received_message):
+        """Submits message to its route, returns False if it is already being handled, waits for a retry, was given up,
+           its route is full or no route matches"""
+
+        message = received_message.receivedMessage
+        route = next((route for route in self.routes if route.matches(message)), None)
+
+        if route is None:
+            if message.messageID not in self._unmatched:
+                self._unmatched.add(message.messageID)
+                self._report(received_message, LookupError(f"No route for message {message.messageID} of business type "
+                                                           f"{message.businessType!r} from {message.senderCode!r}"))
+            return False
+
+        with self._condition:
+            if message.messageID in self._in_flight or route.full:
+                return False
+
+            attempts, retry_at = self._failures.get(message.messageID, (0, 0))
+            if attempts >= self.max_attempts or time.monotonic() < retry_at:
+                return False
+
+            route.pending += 1
+            self._in_flight.add(message.messageID)
+
+        future = route.executor.submit(route.handler, received_message)
+        future.add_done_callback(lambda future: self._done(route, received_message, future))
+
+        return True
+
+    def _report(self, received_message, error):
+
+        if self.on_error:
+            try:
+                self.on_error(received_message, error)
+            except Exception:
+                pass  # A broken callback must not stop dispatching
+
+    def _failed(self, received_message, error):
+        """Counts a failed handler call, schedules the retry or gives the message up"""
+
+        message_id = received_message.receivedMessage.messageID
+
+        with self._condition:
+            attempts = self._failures.get(message_id, (0, 0))[0] + 1
+            self._failures[message_id] = (attempts, time.monotonic() + self.retry_interval * self.backoff ** (attempts - 1))
+
+        self._report(received_message, error)
+
+        if attempts < self.max_attempts or self.dead_letter is None:
+            return
+
+        try:
+            self.dead_letter(received_message, error)
+            self.client.confirm_received_message(message_id)
+        except Exception as dead_letter_error:
+            self._report(received_message, dead_letter_error)
+            return
+
+        with self._condition:
+            self._failures.pop(message_id, None)
+
+    def _done(self, route, received_message, future):
+
+        message_id = received_message.receivedMessage.messageID
+
+        try:
+            error = future.exception()
+
+            if error is not None:
+                self._failed(received_message, error)
+            else:
+                self.client.confirm_received_message(message_id)
+
+                with self._condition:
+                    self._failures.pop(message_id, None)
+
+        except Exception as error:
+            self._report(received_message, error)
+
+        finally:
+            with self._condition:
+                route.pending -= 1
+                self._in_flight.discard(message_id)
+                self._condition.notify_all()
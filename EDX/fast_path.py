@@ -0,0 +1,252 @@
+#-------------------------------------------------------------------------------
+# Name:        fast_path
+# Purpose:     SOAP 1.2 engine for the five MADES operations without zeep object mapping
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import base64
+from urllib.parse import unquote
+from xml.sax.saxutils import escape
+
+import isodate
+from lxml import etree
+from requests_toolbelt.multipart.decoder import MultipartDecoder
+from zeep.exceptions import Fault, TransportError
+
+SOAP_NS = "http://www.w3.org/2003/05/soap-envelope"
+MADES_NS = "http://mades.entsoe.eu/"
+XOP_NS = "http://www.w3.org/2004/08/xop/include"
+
+NAMESPACES = {"soap-env": SOAP_NS, "mades": MADES_NS, "xop": XOP_NS}
+
+OPERATIONS = ("SendMessage", "ReceiveMessage", "ConfirmReceiveMessage", "CheckMessageStatus", "ConnectivityTest")
+
+# Same headers zeep sends for the MadesEndpointSOAP12 binding, action is the soapAction of the operation in the WSDL
+CONTENT_TYPES = {operation: f'application/soap+xml; charset=utf-8; action="{MADES_NS}{operation}"' for operation in OPERATIONS}
+
+# Envelope templates, same layout as produced by zeep. Fields are xml escaped before formatting.
+ENVELOPE_START = f'<?xml version="1.0" encoding="utf-8"?>\n<soap-env:Envelope xmlns:soap-env="{SOAP_NS}"><soap-env:Body>'.encode()
+ENVELOPE_END = b'</soap-env:Body></soap-env:Envelope>'
+
+SEND_MESSAGE_START = (f'<ns0:SendMessageRequest xmlns:ns0="{MADES_NS}"><ns0:message>'
+                      '<ns0:receiverCode>{receiverCode}</ns0:receiverCode>'
+                      '<ns0:businessType>{businessType}</ns0:businessType>'
+                      '<ns0:content>')
+SEND_MESSAGE_END = ('</ns0:content>'
+                    '<ns0:senderApplication>{senderApplication}</ns0:senderApplication>'
+                    '<ns0:baMessageID>{baMessageID}</ns0:baMessageID>'
+                    '</ns0:message><ns0:conversationID>{conversationID}</ns0:conversationID></ns0:SendMessageRequest>')
+RECEIVE_MESSAGE = (f'<ns0:ReceiveMessageRequest xmlns:ns0="{MADES_NS}">'
+                   '<ns0:businessType>{businessType}</ns0:businessType>'
+                   '<ns0:downloadMessage>{downloadMessage}</ns0:downloadMessage></ns0:ReceiveMessageRequest>')
+CONFIRM_RECEIVE_MESSAGE = (f'<ns0:ConfirmReceiveMessageRequest xmlns:ns0="{MADES_NS}">'
+                           '<ns0:messageID>{messageID}</ns0:messageID></ns0:ConfirmReceiveMessageRequest>')
+CHECK_MESSAGE_STATUS = (f'<ns0:CheckMessageStatusRequest xmlns:ns0="{MADES_NS}">'
+                        '<ns0:messageID>{messageID}</ns0:messageID></ns0:CheckMessageStatusRequest>')
+CONNECTIVITY_TEST = (f'<ns0:ConnectivityTestRequest xmlns:ns0="{MADES_NS}">'
+                     '<ns0:receiverCode>{receiverCode}</ns0:receiverCode>'
+                     '<ns0:businessType>{businessType}</ns0:businessType></ns0:ConnectivityTestRequest>')
+
+# Field order of the MADES complex types, absent optional fields are returned as None like zeep does
+RECEIVED_MESSAGE_FIELDS = ("messageID", "receiverCode", "senderCode", "businessType", "content", "senderApplication", "baMessageID")
+MESSAGE_STATUS_FIELDS = ("messageID", "state", "receiverCode", "senderCode", "businessType", "senderApplication", "baMessageID", "sendTimestamp", "receiveTimestamp", "trace")
+MESSAGE_TRACE_ITEM_FIELDS = ("timestamp", "state", "component", "componentDescription", "details")
+
+CONVERTERS = {"remainingMessagesCount": int,
+              "sendTimestamp": isodate.parse_datetime,
+              "receiveTimestamp": isodate.parse_datetime,
+              "timestamp": isodate.parse_datetime}
+
+# Precompiled response lookups
+response_element = etree.XPath("/soap-env:Envelope/soap-env:Body/*[1]", namespaces=NAMESPACES)
+fault_reason = etree.XPath("string(soap-env:Reason/soap-env:Text)", namespaces=NAMESPACES)
+fault_code = etree.XPath("string(soap-env:Code/soap-env:Value)", namespaces=NAMESPACES)
+fault_detail = etree.XPath("soap-env:Detail", namespaces=NAMESPACES)
+xop_href = etree.XPath("string(xop:Include/@href)", namespaces=NAMESPACES)
+
+FAULT_TAG = f"{{{SOAP_NS}}}Fault"
+
+# Reusable parser, never resolves entities or touches the network
+parser = etree.XMLParser(resolve_entities=False, no_network=True)
+
+
+class Result(dict):
+    """Response value with the same fields as the zeep object, readable as attributes or keys"""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _text(value):
+    return escape(str(value)) if value is not None else ""
+
+
+def _localname(element):
+    return element.tag.rpartition("}")[2]
+
+
+def _content(element, attachments):
+    href = xop_href(element)
+    if href:
+        return attachments[unquote(href[4:] if href.startswith("cid:") else href)]
+    return base64.b64decode(element.text or "")
+
+
+def _compound(element, fields, attachments):
+    result = Result.fromkeys(fields)
+
+    for child in element.iterchildren(tag=etree.Element):
+        name = _localname(child)
+
+        if name == "content":
+            result[name] = _content(child, attachments)
+        elif name == "trace":
+            result[name] = Result(trace=[_compound(item, MESSAGE_TRACE_ITEM_FIELDS, attachments) for item in child.iterchildren(tag=etree.Element)])
+        else:
+            converter = CONVERTERS.get(name)
+            result[name] = converter(child.text) if converter else child.text
+
+    return result
+
+
+def parse_document(response, parser=parser):
+    """Returns (envelope element, attachments) of a MADES SOAP response, raises zeep TransportError like zeep"""
+
+    if response.status_code != 200 and not response.content:
+        raise TransportError(f"Server returned HTTP status {response.status_code} (no content available)",
+                             status_code=response.status_code)
+
+    content = response.content
+    attachments = {}
+    content_type = response.headers.get("Content-Type", "")
+
+    if content_type.startswith("multipart/related"):
+        parts = MultipartDecoder(content, content_type, response.encoding or "utf-8").parts
+        content = parts[0].content
+        attachments = {part.headers.get(b"Content-ID", b"").decode().strip("<>"): part.content for part in parts[1:]}
+
+    try:
+        document = etree.fromstring(content, parser)
+    except etree.XMLSyntaxError as exc:
+        raise TransportError(f"Server returned response ({response.status_code}) with invalid XML: {exc}.\nContent: {response.content!r}",
+                             status_code=response.status_code,
+                             content=response.content)
+
+    return document, attachments
+
+
+def response_body(document, status_code=200):
+    """Returns the operation response element of the envelope, raises zeep Fault like zeep"""
+
+    elements = response_element(document)
+    element = elements[0] if elements else None
+
+    if status_code != 200 or element is None or element.tag == FAULT_TAG:
+
+        if element is None or element.tag != FAULT_TAG:
+            raise Fault(message="Unknown fault occured", code=None, actor=None, detail=etree.tostring(document))
+
+        details = fault_detail(element)
+        raise Fault(message=fault_reason(element),
+                    code=fault_code(element),
+                    actor=None,
+                    detail=details[0] if details else None)
+
+    return element
+
+
+class FastService:
+    """
+    Drop-in replacement for the zeep service of the MadesEndpointSOAP12 binding.
+
+    Requests are built from precompiled envelope templates and responses are read with precompiled
+    XPath lookups, skipping zeep's generic XSD serialisation. Returned values have the same fields as
+    zeep objects. Faults raise zeep.exceptions.Fault, so error handling stays the same for both engines.
+
+    Args:
+        transport (zeep.transports.Transport): Transport used to post the envelopes.
+        address (str): Web service endpoint address.
+        plugins (list, optional): zeep plugins, egress/ingress are called with parsed envelopes only if given.
+    """
+
+    def __init__(self, transport, address, plugins=None):
+        self.transport = transport
+        self.address = address
+        self.plugins = plugins or []
+        self.parser = parser
+
+    def _call(self, operation, body):
+
+        message = b"".join((ENVELOPE_START, body, ENVELOPE_END))
+        headers = {"Content-Type": CONTENT_TYPES[operation]}
+
+        for plugin in self.plugins:
+            plugin.egress(etree.fromstring(message, self.parser), headers, None, None)
+
+        response = self.transport.post(self.address, message, headers)
+
+        document, attachments = parse_document(response, self.parser)
+
+        for plugin in self.plugins:
+            plugin.ingress(document, response.headers, None)
+
+        return response_body(document, response.status_code), attachments
+
+    def _call_message_id(self, operation, body):
+        element, _ = self._call(operation, body.encode())
+        return element.findtext(f"{{{MADES_NS}}}messageID") or element.findtext("messageID")
+
+    def SendMessage(self, message, conversationID=""):
+        """SendMessage(message: ns0:SentMessage, conversationID: xsd:string) -> messageID: xsd:string"""
+
+        start = SEND_MESSAGE_START.format(receiverCode=_text(message.get("receiverCode")),
+                                          businessType=_text(message.get("businessType")))
+        end = SEND_MESSAGE_END.format(senderApplication=_text(message.get("senderApplication")),
+                                      baMessageID=_text(message.get("baMessageID")),
+                                      conversationID=_text(conversationID))
+
+        element, _ = self._call("SendMessage", b"".join((start.encode(), base64.b64encode(message.get("content") or b""), end.encode())))
+
+        return element.findtext(f"{{{MADES_NS}}}messageID") or element.findtext("messageID")
+
+    def ReceiveMessage(self, businessType, downloadMessage):
+        """ReceiveMessage(businessType: xsd:string, downloadMessage: xsd:boolean) -> receivedMessage: ns0:ReceivedMessage, remainingMessagesCount: xsd:long"""
+
+        body = RECEIVE_MESSAGE.format(businessType=_text(businessType), downloadMessage="true" if downloadMessage else "false")
+        element, attachments = self._call("ReceiveMessage", body.encode())
+
+        result = Result(receivedMessage=None, remainingMessagesCount=None)
+
+        for child in element.iterchildren(tag=etree.Element):
+            name = _localname(child)
+
+            if name == "receivedMessage":
+                result[name] = _compound(child, RECEIVED_MESSAGE_FIELDS, attachments)
+            elif name == "remainingMessagesCount":
+                result[name] = int(child.text)
+
+        return result
+
+    def ConfirmReceiveMessage(self, messageID):
+        """ConfirmReceiveMessage(messageID: xsd:string) -> messageID: xsd:string"""
+
+        return self._call_message_id("ConfirmReceiveMessage", CONFIRM_RECEIVE_MESSAGE.format(messageID=_text(messageID)))
+
+    def CheckMessageStatus(self, messageID):
+        """CheckMessageStatus(messageID: xsd:string) -> messageStatus: ns0:MessageStatus"""
+
+        element, attachments = self._call("CheckMessageStatus", CHECK_MESSAGE_STATUS.format(messageID=_text(messageID)).encode())
+        status = next(element.iterchildren(tag=etree.Element), None)
+
+        return _compound(status, MESSAGE_STATUS_FIELDS, attachments) if status is not None else None
+
+    def ConnectivityTest(self, receiverCode, businessType):
+        """ConnectivityTest(receiverCode: xsd:string, businessType: xsd:string) -> messageID: xsd:string"""
+
+        return self._call_message_id("ConnectivityTest", CONNECTIVITY_TEST.format(receiverCode=_text(receiverCode), businessType=_text(businessType)))
+
@@ -0,0 +1,248 @@
+#-------------------------------------------------------------------------------
+# Name:        inbox
+# Purpose:     SQLite backed local inbox with messageID deduplication and confirm journal
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from zeep.exceptions import Fault
+
+from EDX.fast_path import Result
+
+# Message states in the inbox, in the order a message goes through them
+RECEIVED = "received"      # Content stored, not handed out for processing, e.g. left over from a crash
+PROCESSING = "processing"  # Claimed by a caller of receive() or pending(), being processed
+PROCESSED = "processed"    # Processing done, confirmation to the server pending
+CONFIRMED = "confirmed"    # Confirmed on the server, kept for deduplication
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inbox (
+    message_id TEXT PRIMARY KEY,
+    business_type TEXT,
+    sender_code TEXT,
+    receiver_code TEXT,
+    sender_application TEXT,
+    ba_message_id TEXT,
+    content_path TEXT,
+    size INTEGER,
+    state TEXT NOT NULL,
+    received_at REAL,
+    processed_at REAL,
+    confirmed_at REAL,
+    redeliveries INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+class Inbox:
+    """
+    Embedded inbox that makes receive -> process -> confirm effectively-once across crashes.
+
+    Received content is streamed to a file under 'content_dir' and its metadata stored in SQLite keyed by
+    messageID. The confirm step is journaled: mark_processed() records that processing finished before the
+    server is told, so after a crash recover() confirms everything that was processed but not confirmed,
+    and a message redelivered by the server is recognised by its messageID and confirmed again instead of
+    being handed out for processing a second time.
+
+    Args:
+        path (str): SQLite database file.
+        content_dir (str, optional): Directory for received content. Defaults to "<path>.content".
+
+    Notes:
+        - Typical loop: message = inbox.receive(client, "RIMD"); process(message.content_path); inbox.complete(client, message.message_id)
+        - Call recover(client) at startup, then process pending() messages received before a crash.
+        - One Inbox may be shared between threads, receive() and pending() claim every message for exactly one caller.
+          Use one database per consuming process, claims left by a previous process are released when the Inbox is opened.
+    """
+
+    def __init__(self, path, content_dir=None):
+
+        self.path = path
+        self.content_dir = content_dir or f"{path}.content"
+        os.makedirs(self.content_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(SCHEMA)
+
+        # Claims of a previous process, its processing did not finish
+        self._db.execute("UPDATE inbox SET state = ? WHERE state = ?", (RECEIVED, PROCESSING))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.close()
+
+    def _execute(self, sql, parameters=()):
+        with self._lock:
+            return self._db.execute(sql, parameters).fetchall()
+
+    def _content_path(self, message_id):
+        return os.path.join(self.content_dir, hashlib.sha256(message_id.encode()).hexdigest())
+
+    def get(self, message_id):
+        """Returns inbox entry of message_id or None"""
+
+        rows = self._execute("SELECT * FROM inbox WHERE message_id = ?", (message_id,))
+        return Result(rows[0]) if rows else None
+
+    def messages(self, state=None):
+        """Returns inbox entries, optionally only those in the given state, oldest first"""
+
+        if state:
+            rows = self._execute("SELECT * FROM inbox WHERE state = ? ORDER BY received_at", (state,))
+        else:
+            rows = self._execute("SELECT * FROM inbox ORDER BY received_at")
+
+        return [Result(row) for row in rows]
+
+    def pending(self):
+        """Claims and returns entries received but not processed yet, e.g. left over from a crash"""
+
+        claimed = []
+
+        for entry in self.messages(RECEIVED):
+            with self._lock:
+                cursor = self._db.execute("UPDATE inbox SET state = ? WHERE message_id = ? AND state = ?", (PROCESSING, entry.message_id, RECEIVED))
+
+            if cursor.rowcount == 1:
+                claimed.append(Result(entry, state=PROCESSING))
+
+        return claimed
+
+    def _claim(self, message, temp_path):
+        """
+        Records a received message and claims it for processing in one transaction.
+        Returns (entry, claimed), claimed is False if the message is already known and not waiting in RECEIVED state.
+        """
+
+        content_path = self._content_path(message.messageID)
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+
+            try:
+                cursor = self._db.execute("INSERT OR IGNORE INTO inbox (message_id, business_type, sender_code, receiver_code, sender_application, "
+                                          "ba_message_id, content_path, size, state, received_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                          (message.messageID, message.businessType, message.senderCode, message.receiverCode,
+                                           message.senderApplication, message.baMessageID, content_path, message.size, PROCESSING, time.time()))
+                inserted = cursor.rowcount == 1
+                claimed = inserted
+
+                if not inserted:
+                    # Redelivery of a known message, claimed only if nobody is processing it
+                    self._db.execute("UPDATE inbox SET redeliveries = redeliveries + 1 WHERE message_id = ?", (message.messageID,))
+                    cursor = self._db.execute("UPDATE inbox SET state = ? WHERE message_id = ? AND state = ?", (PROCESSING, message.messageID, RECEIVED))
+                    claimed = cursor.rowcount == 1
+
+                if inserted or (claimed and not os.path.exists(content_path)):
+                    if os.path.exists(temp_path):
+                        os.replace(temp_path, content_path)
+                    else:
+                        open(content_path, "wb").close()  # Empty content
+
+                self._db.execute("COMMIT")
+
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+            entry = Result(self._db.execute("SELECT * FROM inbox WHERE message_id = ?", (message.messageID,)).fetchone())
+
+        return entry, claimed
+
+    def receive(self, client, business_type="*"):
+        """
+        Receives the next new message into the inbox and returns its entry, or None when the queue is empty or its next
+        message is being processed by another thread.
+
+        Content is streamed to a file under content_dir (entry.content_path). Messages the server redelivers are
+        handled without returning them twice: already processed ones are confirmed again, and one still waiting in
+        RECEIVED state (e.g. from before a crash) is claimed and returned, so it is processed once.
+        """
+
+        temp_path = os.path.join(self.content_dir, f"receiving-{threading.get_ident()}")
+
+        while True:
+            received_message = client.receive_message_to_file(temp_path, business_type)
+            message = received_message.receivedMessage
+
+            if message is None:
+                return None
+
+            try:
+                entry, claimed = self._claim(message, temp_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+            if claimed:
+                return entry
+
+            if entry.state == PROCESSING:
+                return None
+
+            try:
+                self.confirm(client, message.messageID)
+            except Fault:
+                # Confirmed meanwhile by the thread that processed it
+                self._execute("UPDATE inbox SET state = ?, confirmed_at = ? WHERE message_id = ?", (CONFIRMED, time.time(), message.messageID))
+
+    def mark_processed(self, message_id):
+        """Journals that processing of message_id finished, must be called before the server is told"""
+
+        self._execute("UPDATE inbox SET state = ?, processed_at = ? WHERE message_id = ? AND state IN (?, ?)",
+                      (PROCESSED, time.time(), message_id, PROCESSING, RECEIVED))
+
+    def confirm(self, client, message_id):
+        """Confirms a processed message on the server and records it as confirmed"""
+
+        client.confirm_received_message(message_id)
+        self._execute("UPDATE inbox SET state = ?, confirmed_at = ? WHERE message_id = ?", (CONFIRMED, time.time(), message_id))
+
+    def complete(self, client, message_id):
+        """mark_processed and confirm in one call, use after the message has been fully processed"""
+
+        self.mark_processed(message_id)
+        self.confirm(client, message_id)
+
+    def recover(self, client):
+        """
+        Confirms messages that were processed but not confirmed before a crash, returns their messageIDs.
+        A SOAP fault for such a message means the server no longer has it, so it is recorded as confirmed.
+        """
+
+        recovered = []
+
+        for entry in self.messages(PROCESSED):
+            try:
+                self.confirm(client, entry.message_id)
+            except Fault:
+                self._execute("UPDATE inbox SET state = ?, confirmed_at = ? WHERE message_id = ?", (CONFIRMED, time.time(), entry.message_id))
+
+            recovered.append(entry.message_id)
+
+        return recovered
+
+    def remove_content(self, message_id):
+        """Deletes stored content of a confirmed message, the entry stays for deduplication"""
+
+        entry = self.get(message_id)
+
+        if entry and entry.state == CONFIRMED and entry.content_path:
+            if os.path.exists(entry.content_path):
+                os.remove(entry.content_path)
+            self._execute("UPDATE inbox SET content_path = NULL WHERE message_id = ?", (message_id,))
@@ -0,0 +1,207 @@
+#-------------------------------------------------------------------------------
+# Name:        instrumentation
+# Purpose:     Per operation timing and structured logging of Client calls
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import logging
+import threading
+import time
+
+from requests import Session
+
+logger = logging.getLogger("EDX")
+logger.addHandler(logging.NullHandler())
+
+# Phases of a call: building the envelope, HTTP round-trip (including reading the body) and parsing the response
+PHASES = ("serialize", "network", "parse")
+
+_local = threading.local()
+
+
+def current_operation():
+    """Returns the Operation running on this thread or None"""
+
+    return getattr(_local, "operation", None)
+
+
+class Operation:
+    """
+    Timing and attributes of one Client call.
+
+    Attributes:
+        name (str): Client method name, e.g. "send_message".
+        attributes (dict): MADES fields of the call, e.g. businessType, receiverCode, messageID.
+        phases (dict): Seconds spent in each of PHASES.
+        intervals (list): (phase, start, end) in time.perf_counter() seconds, in order, a phase may occur more than once.
+        duration (float): Seconds from start to end of the call.
+        request_bytes (int): Size of sent HTTP bodies, None if not known.
+        response_bytes (int): Size of received HTTP bodies, None if not known (streamed responses).
+        error (Exception): Exception the call raised or None.
+    """
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.phases = {}
+        self.intervals = []
+        self.duration = None
+        self.request_bytes = None
+        self.response_bytes = None
+        self.error = None
+        self.started = time.perf_counter()
+        self._last = self.started
+        self._phase = "serialize"
+
+    def set(self, **attributes):
+        """Adds attributes known only after the call, e.g. messageID"""
+
+        self.attributes.update(attributes)
+
+    def mark(self, next_phase):
+        """Ends the current phase now and starts next_phase"""
+
+        now = time.perf_counter()
+        self.phases[self._phase] = self.phases.get(self._phase, 0) + now - self._last
+        self.intervals.append((self._phase, self._last, now))
+        self._last = now
+        self._phase = next_phase
+
+    def add_bytes(self, request_bytes, response_bytes):
+
+        if request_bytes is not None:
+            self.request_bytes = (self.request_bytes or 0) + request_bytes
+
+        if response_bytes is not None:
+            self.response_bytes = (self.response_bytes or 0) + response_bytes
+
+    def finish(self, error=None):
+        self.mark(None)
+        self.duration = self._last - self.started
+        self.error = error
+
+    def as_dict(self):
+        return {"operation": self.name,
+                "duration": self.duration,
+                **{phase: self.phases.get(phase, 0) for phase in PHASES},
+                "request_bytes": self.request_bytes,
+                "response_bytes": self.response_bytes,
+                "error": repr(self.error) if self.error is not None else None,
+                **self.attributes}
+
+    def __str__(self):
+        fields = [f"{self.name} {self.duration * 1000:.1f} ms"]
+        fields += [f"{phase}={self.phases.get(phase, 0) * 1000:.1f}ms" for phase in PHASES]
+        fields += [f"{key}={value}" for key, value in (("request_bytes", self.request_bytes), ("response_bytes", self.response_bytes)) if value is not None]
+        fields += [f"{key}={value}" for key, value in self.attributes.items() if value not in (None, "")]
+
+        if self.error is not None:
+            fields.append(f"error={self.error!r}")
+
+        return " ".join(fields)
+
+
+class _NullOperation:
+    """Stands in for Operation when nothing consumes it, so disabled instrumentation costs one method call"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NULL_OPERATION = _NullOperation()
+
+
+class _OperationContext:
+
+    def __init__(self, instrumentation, operation):
+        self.instrumentation = instrumentation
+        self.operation = operation
+        self.outer = None
+
+    def __enter__(self):
+        self.outer = current_operation()
+        _local.operation = self.operation
+        return self.operation
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        _local.operation = self.outer
+        self.operation.finish(exc_value)
+        self.instrumentation.emit(self.operation)
+        return False
+
+
+class Instrumentation:
+    """
+    Creates an Operation per Client call and passes it, when finished, to the "EDX" logger and observers.
+
+    Finished operations are logged at DEBUG level with the message "<name> <duration> serialize=.. network=.. parse=.. ..."
+    and the fields of Operation.as_dict() in the 'edx' attribute of the log record, for structured log formatters.
+    If the logger is not enabled for DEBUG and there are no observers, no Operation is created at all.
+
+    Attributes:
+        observers (list): Callables called as observer(operation) after each call, their exceptions are ignored.
+    """
+
+    def __init__(self):
+        self.observers = []
+
+    @property
+    def enabled(self):
+        return bool(self.observers) or logger.isEnabledFor(logging.DEBUG)
+
+    def operation(self, name, **attributes):
+        """Context manager timing one call, yields the Operation (or a stand-in with set() when disabled)"""
+
+        if not self.enabled:
+            return _NULL_OPERATION
+
+        return _OperationContext(self, Operation(name, attributes))
+
+    def emit(self, operation):
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s", operation, extra={"edx": operation.as_dict()})
+
+        for observer in self.observers:
+            try:
+                observer(operation)
+            except Exception:
+                pass  # A broken observer must not fail the call
+
+
+class TimedSession(Session):
+    """requests.Session that splits the Operation running on the calling thread into serialize, network and parse phases
+       and adds HTTP body sizes to it. Requests made outside of an Operation (WSDL download) are not affected.
+       Bodies of streamed responses are read while they are parsed, so for them transfer time counts as parse."""
+
+    def request(self, method, url, *args, **kwargs):
+
+        operation = current_operation()
+
+        if operation is None:
+            return super().request(method, url, *args, **kwargs)
+
+        operation.mark("network")
+
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        finally:
+            operation.mark("parse")
+
+        request_bytes = response.request.headers.get("Content-Length")
+
+        if kwargs.get("stream"):
+            response_bytes = response.headers.get("Content-Length")
+        else:
+            response_bytes = len(response.content)
+
+        operation.add_bytes(int(request_bytes) if request_bytes is not None else None,
+                            int(response_bytes) if response_bytes is not None else None)
+
+        return response
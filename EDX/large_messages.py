@@ -0,0 +1,58 @@
+#-------------------------------------------------------------------------------
+# Name:        large_messages
+# Purpose:     Parser and response size limit used by Client large message mode
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+from lxml import etree
+from zeep.exceptions import TransportError
+
+# Reusable parser without libxml2 text node (~10 MB) and depth limits, still never resolves entities or touches the network
+huge_tree_parser = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True)
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class MessageTooLarge(TransportError):
+    """Response body exceeds the max_message_size of the Client"""
+
+
+def response_size_limit(max_size):
+    """
+    Returns a requests response hook that rejects response bodies larger than max_size bytes.
+
+    The declared Content-Length is checked before anything is read. Bodies without it are read in chunks
+    and the connection is dropped as soon as the limit is passed, so an oversized response never ends up in
+    memory in full. Streamed responses (stream=True) are only checked by their Content-Length.
+    """
+
+    def check_response_size(response, *args, **kwargs):
+
+        length = response.headers.get("Content-Length")
+
+        if length is not None and int(length) > max_size:
+            response.close()
+            raise MessageTooLarge(f"Response of {length} bytes exceeds max_message_size of {max_size} bytes",
+                                  status_code=response.status_code)
+
+        if length is not None or kwargs.get("stream"):
+            return response
+
+        chunks = []
+        size = 0
+
+        for chunk in response.iter_content(READ_CHUNK_SIZE):
+            size += len(chunk)
+
+            if size > max_size:
+                response.close()
+                raise MessageTooLarge(f"Response exceeds max_message_size of {max_size} bytes",
+                                      status_code=response.status_code)
+
+            chunks.append(chunk)
+
+        response._content = b"".join(chunks)
+
+        return response
+
+    return check_response_size
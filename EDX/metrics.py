@@ -0,0 +1,270 @@
+#-------------------------------------------------------------------------------
+# Name:        metrics
+# Purpose:     In-process counters, gauges and histograms of Client calls with Prometheus text export
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lxml import etree
+from zeep.exceptions import Fault
+
+from EDX.instrumentation import PHASES
+
+# Upper bounds in seconds of latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value not in (float("inf"), float("-inf")) else ("+Inf" if value > 0 else "-Inf")
+
+
+class Metric:
+    """Base of metric types, values are kept per combination of label values"""
+
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+
+        if set(labels) != set(self.labels):
+            raise ValueError(f"Metric {self.name} takes labels {self.labels}, got {tuple(labels)}")
+
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        """Returns list of (name suffix, label values, extra labels, value)"""
+
+        with self._lock:
+            return [("", key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type}"]
+        lines += [f"{self.name}{suffix}{_format_labels(self.labels, key, extra)} {_format_value(value)}"
+                  for suffix, key, extra, value in self.samples()]
+
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+
+            self._values[key] = (counts, total + value)
+
+    def value(self, **labels):
+        """Returns (count, sum) of observations"""
+
+        counts, total = self._values.get(self._key(labels), ([0], 0))
+        return sum(counts), total
+
+    def samples(self):
+
+        samples = []
+
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = 0
+
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    samples.append(("_bucket", key, (("le", _format_value(bound)),), cumulative))
+
+                samples.append(("_sum", key, (), total))
+                samples.append(("_count", key, (), cumulative))
+
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of metrics, rendered together in Prometheus text format.
+
+    Passed to Client(metrics=...) it is updated after every call: call counts, errors by SOAP fault type, latency and
+    phase histograms, HTTP bytes sent and received and the last remainingMessagesCount per business type. One registry
+    may be shared by several clients.
+
+    Notes:
+        - counter(), gauge() and histogram() return the existing metric when the name is already registered.
+        - serve(port) exposes render() on http://<address>:<port>/metrics from a daemon thread.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+        self.calls = self.counter("edx_calls_total", "Client calls by operation", ["operation"])
+        self.errors = self.counter("edx_errors_total", "Failed Client calls by operation and SOAP fault or exception type", ["operation", "fault"])
+        self.latency = self.histogram("edx_call_duration_seconds", "Duration of Client calls", ["operation"])
+        self.phases = self.histogram("edx_call_phase_seconds", "Time of Client calls spent in serialize, network and parse", ["operation", "phase"])
+        self.sent_bytes = self.counter("edx_sent_bytes_total", "HTTP request body bytes by operation", ["operation"])
+        self.received_bytes = self.counter("edx_received_bytes_total", "HTTP response body bytes by operation", ["operation"])
+        self.remaining_messages = self.gauge("edx_remaining_messages", "Last remainingMessagesCount reported by ReceiveMessage", ["business_type"])
+
+    def _register(self, metric_class, name, *args, **kwargs):
+
+        with self._lock:
+            metric = self._metrics.get(name)
+
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric {name} is already registered as {metric.type}")
+
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, documentation, labels, buckets)
+
+    def render(self):
+        """Returns all metrics in Prometheus text exposition format"""
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def observe(self, operation):
+        """Instrumentation observer updating the Client metrics from a finished Operation"""
+
+        name = operation.name
+        self.calls.inc(operation=name)
+        self.latency.observe(operation.duration, operation=name)
+
+        for phase in PHASES:
+            if phase in operation.phases:
+                self.phases.observe(operation.phases[phase], operation=name, phase=phase)
+
+        if operation.request_bytes:
+            self.sent_bytes.inc(operation.request_bytes, operation=name)
+
+        if operation.response_bytes:
+            self.received_bytes.inc(operation.response_bytes, operation=name)
+
+        if operation.error is not None:
+            self.errors.inc(operation=name, fault=fault_type(operation.error))
+
+        elif operation.attributes.get("remainingMessagesCount") is not None:
+            self.remaining_messages.set(operation.attributes["remainingMessagesCount"], business_type=operation.attributes.get("businessType"))
+
+    def serve(self, port=9464, address="127.0.0.1"):
+        """Starts an HTTP server returning render() on GET /metrics, returns the server (call shutdown() to stop)"""
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((address, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="EDX-metrics", daemon=True).start()
+
+        return server
+
+
+def fault_type(error):
+    """Returns the SOAP fault detail element name (e.g. "CheckMessageStatusError"), fault code or exception class name"""
+
+    if isinstance(error, Fault):
+        detail = error.detail
+
+        if isinstance(detail, etree._Element) and len(detail):
+            return etree.QName(detail[0]).localname
+
+        if error.code:
+            return str(error.code).rpartition(":")[2]
+
+    return type(error).__name__
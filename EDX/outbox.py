@@ -0,0 +1,237 @@
+#-------------------------------------------------------------------------------
+# Name:        outbox
+# Purpose:     SQLite backed persistent outbox with concurrent sending and crash recovery
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import ConnectTimeout, RequestException
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+from zeep.exceptions import Fault
+
+from EDX.fast_path import Result
+
+# Message states in the outbox
+PENDING = "pending"    # Waiting to be sent
+SENDING = "sending"    # SendMessage call in progress
+SENT = "sent"          # Accepted by the server, message_id recorded
+FAILED = "failed"      # Rejected by the server with a SOAP fault, error recorded
+IN_DOUBT = "in_doubt"  # Call interrupted after the request may have reached the server, not resent automatically
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    ba_message_id TEXT PRIMARY KEY,
+    receiver_code TEXT NOT NULL,
+    business_type TEXT NOT NULL,
+    sender_application TEXT,
+    conversation_id TEXT,
+    content_path TEXT NOT NULL,
+    owns_content INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    message_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL,
+    sent_at REAL
+)
+"""
+
+
+def _not_sent(error):
+    """True if a requests error shows the connection was never opened, so the request did not reach the server"""
+
+    if isinstance(error, ConnectTimeout):
+        return True
+
+    reason = error.args[0] if error.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+
+    return isinstance(reason, NewConnectionError)
+
+
+class Outbox:
+    """
+    Persistent queue of messages to send, so the outcome of every send is known after a crash.
+
+    put() stores the message in SQLite under its baMessageID before anything goes to the network, send()
+    sends pending messages with a thread pool and records the returned messageID. The baMessageID is the
+    idempotency key: putting the same one again returns the existing entry, and a message is only sent
+    again when it provably did not reach the server (the connection could not be opened). Such a call is
+    retried by send() up to 'retries' times with exponential backoff and, if the server stays unreachable,
+    left PENDING for the next send(). A call interrupted after the request may have been delivered, including
+    one in progress when the process died, is moved to IN_DOUBT and is resent only after resend() is called for it.
+
+    Args:
+        path (str): SQLite database file.
+        content_dir (str, optional): Directory for content given as bytes. Defaults to "<path>.content".
+        max_workers (int, optional): Concurrent SendMessage calls in send(). Defaults to 4.
+        retries (int, optional): Retries of a message whose connection could not be opened, within one send(). Defaults to 3.
+        retry_interval (float, optional): Seconds before the first retry. Defaults to 1.
+        backoff (float, optional): Multiplier of the wait before each further retry. Defaults to 2.
+
+    Notes:
+        - Content given as a file path is stored by reference and must stay in place until the message is sent.
+        - Content is streamed with Client.send_file, set pool_maxsize of the Client to at least max_workers.
+        - Use one database per sending process.
+    """
+
+    def __init__(self, path, content_dir=None, max_workers=4, retries=3, retry_interval=1, backoff=2):
+
+        self.path = path
+        self.content_dir = content_dir or f"{path}.content"
+        self.max_workers = max_workers
+        self.retries = retries
+        self.retry_interval = retry_interval
+        self.backoff = backoff
+        os.makedirs(self.content_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(SCHEMA)
+
+        # Calls in progress when the previous process stopped may or may not have reached the server
+        self._execute("UPDATE outbox SET state = ? WHERE state = ?", (IN_DOUBT, SENDING))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.close()
+
+    def _execute(self, sql, parameters=()):
+        with self._lock:
+            return self._db.execute(sql, parameters).fetchall()
+
+    def get(self, ba_message_id):
+        """Returns outbox entry of ba_message_id or None"""
+
+        rows = self._execute("SELECT * FROM outbox WHERE ba_message_id = ?", (ba_message_id,))
+        return Result(rows[0]) if rows else None
+
+    def messages(self, state=None):
+        """Returns outbox entries, optionally only those in the given state, oldest first"""
+
+        if state:
+            rows = self._execute("SELECT * FROM outbox WHERE state = ? ORDER BY created_at", (state,))
+        else:
+            rows = self._execute("SELECT * FROM outbox ORDER BY created_at")
+
+        return [Result(row) for row in rows]
+
+    def put(self, receiver_EIC, business_type, content=None, file=None, sender_EIC="", ba_message_id=None, conversation_id=""):
+        """
+        Stores a message for sending and returns its baMessageID (a new UUID unless given).
+        Pass the payload as 'content' (bytes, copied into content_dir) or 'file' (path, stored by reference).
+        If ba_message_id is already in the outbox nothing is stored and the existing entry is kept.
+        """
+
+        if (content is None) == (file is None):
+            raise ValueError("Give either content or file")
+
+        ba_message_id = ba_message_id or str(uuid.uuid4())
+
+        if self.get(ba_message_id):
+            return ba_message_id
+
+        if file is None:
+            content_path = os.path.join(self.content_dir, hashlib.sha256(ba_message_id.encode()).hexdigest())
+            temp_path = f"{content_path}.tmp"
+            with open(temp_path, "wb") as content_file:
+                content_file.write(content)
+                content_file.flush()
+                os.fsync(content_file.fileno())
+            os.replace(temp_path, content_path)
+        else:
+            content_path = os.path.abspath(file)
+
+        self._execute("INSERT OR IGNORE INTO outbox (ba_message_id, receiver_code, business_type, sender_application, conversation_id, "
+                      "content_path, owns_content, state, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                      (ba_message_id, receiver_EIC, business_type, sender_EIC, conversation_id, content_path, file is None, PENDING, time.time()))
+
+        return ba_message_id
+
+    def resend(self, ba_message_id=None):
+        """Returns all IN_DOUBT messages, or only ba_message_id when IN_DOUBT or FAILED, to PENDING for the next send().
+           Use after checking with the receiver that the message did not arrive, or when it deduplicates by baMessageID."""
+
+        if ba_message_id:
+            self._execute("UPDATE outbox SET state = ? WHERE ba_message_id = ? AND state IN (?, ?)", (PENDING, ba_message_id, IN_DOUBT, FAILED))
+        else:
+            self._execute("UPDATE outbox SET state = ? WHERE state = ?", (PENDING, IN_DOUBT))
+
+    def send(self, client):
+        """Sends all PENDING messages concurrently and returns their entries after the attempt, in outbox order"""
+
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM outbox WHERE state = ? ORDER BY created_at", (PENDING,)).fetchall()
+            self._db.executemany("UPDATE outbox SET state = ?, attempts = attempts + 1 WHERE ba_message_id = ?",
+                                 [(SENDING, row["ba_message_id"]) for row in rows])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="EDX-outbox") as executor:
+            ba_message_ids = list(executor.map(lambda row: self._send(client, Result(row)), rows))
+
+        return [self.get(ba_message_id) for ba_message_id in ba_message_ids]
+
+    def _send(self, client, entry):
+
+        retry_interval = self.retry_interval
+
+        for retry in range(self.retries + 1):
+
+            if retry:
+                time.sleep(retry_interval)
+                retry_interval *= self.backoff
+                self._execute("UPDATE outbox SET attempts = attempts + 1 WHERE ba_message_id = ?", (entry.ba_message_id,))
+
+            try:
+                if client.wsse:
+                    with open(entry.content_path, "rb") as content_file:
+                        message_id = client.send_message(entry.receiver_code, entry.business_type, content_file.read(),
+                                                         entry.sender_application, entry.ba_message_id, entry.conversation_id)
+                else:
+                    message_id = client.send_file(entry.receiver_code, entry.business_type, entry.content_path,
+                                                  entry.sender_application, entry.ba_message_id, entry.conversation_id)
+
+            except RequestException as error:
+
+                if _not_sent(error):
+                    # Did not reach the server, safe to retry, left PENDING for the next send() when retries run out
+                    self._execute("UPDATE outbox SET error = ? WHERE ba_message_id = ?", (repr(error), entry.ba_message_id))
+                    continue
+
+                self._execute("UPDATE outbox SET state = ?, error = ? WHERE ba_message_id = ?", (IN_DOUBT, repr(error), entry.ba_message_id))
+
+            except (Fault, OSError) as error:
+                # Rejected by the server or content not readable, sending it again will not help
+                self._execute("UPDATE outbox SET state = ?, error = ? WHERE ba_message_id = ?", (FAILED, repr(error), entry.ba_message_id))
+
+            except Exception as error:
+                self._execute("UPDATE outbox SET state = ?, error = ? WHERE ba_message_id = ?", (IN_DOUBT, repr(error), entry.ba_message_id))
+
+            else:
+                self._execute("UPDATE outbox SET state = ?, message_id = ?, error = NULL, sent_at = ? WHERE ba_message_id = ?",
+                              (SENT, message_id, time.time(), entry.ba_message_id))
+
+                if entry.owns_content and os.path.exists(entry.content_path):
+                    os.remove(entry.content_path)
+
+            return entry.ba_message_id
+
+        self._execute("UPDATE outbox SET state = ? WHERE ba_message_id = ?", (PENDING, entry.ba_message_id))
+
+        return entry.ba_message_id
@@ -0,0 +1,372 @@
+#-------------------------------------------------------------------------------
+# Name:        polling
+# Purpose:     Adaptive ReceiveMessage polling loops
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+CONFIRM_MODES = ("after_process", "on_receive", None)
+
+# Seconds a Prefetcher waits on its buffer between checks for stop() and receive errors, independent of min_interval
+BUFFER_TIMEOUT = 0.1
+
+# Confirmed messageIDs a Prefetcher remembers, a receive racing with a confirm may still return the confirmed message
+RECENTLY_CONFIRMED = 100
+
+
+class ReceivePoller:
+    """
+    Endless ReceiveMessage loop that adapts its polling interval to the queue.
+
+    While the server reports remainingMessagesCount > 0 the next message is asked for immediately. Each empty
+    response multiplies the wait by 'backoff' up to 'max_interval', and any received message brings it back to
+    'min_interval'. Every wait is randomised by +-'jitter' (fraction) so many pollers do not synchronise.
+
+    Args:
+        client (EDX.Client): Client used for receive_message and confirm_received_message.
+        business_type (str, optional): Business type to receive. Defaults to "*".
+        min_interval (float, optional): Seconds to wait after a message when the queue is empty. Defaults to 1.
+        max_interval (float, optional): Upper bound for seconds between polls of an idle queue. Defaults to 60.
+        backoff (float, optional): Interval multiplier after an empty response. Defaults to 2.
+        jitter (float, optional): Relative random spread of each wait, 0.1 means +-10%. Defaults to 0.1.
+        confirm (str, optional): "after_process" confirms a message when the caller asks for the next one (at-least-once),
+            "on_receive" confirms before it is handed out (at-most-once), None leaves confirming to the caller. Defaults to "after_process".
+
+    Notes:
+        - Iterate over the poller to get receive_message results, iteration ends only after stop().
+        - stop() may be called from any thread and interrupts a wait immediately.
+    """
+
+    def __init__(self, client, business_type="*", min_interval=1, max_interval=60, backoff=2, jitter=0.1, confirm="after_process"):
+
+        if confirm not in CONFIRM_MODES:
+            raise ValueError(f"Unknown confirm mode {confirm!r}, use 'after_process', 'on_receive' or None")
+
+        self.client = client
+        self.business_type = business_type
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.confirm = confirm
+
+        self.interval = min_interval
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    @property
+    def stopped(self):
+        return self._stopped.is_set()
+
+    def next_delay(self, received_message):
+        """Updates the interval from a receive_message result and returns seconds to wait before the next poll"""
+
+        if received_message.receivedMessage is None:
+            delay = self.interval
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+        else:
+            self.interval = self.min_interval
+            delay = 0 if received_message.remainingMessagesCount else self.min_interval
+
+        return delay * (1 + random.uniform(-self.jitter, self.jitter)) if delay else 0
+
+    def wait(self, delay):
+        """Sleeps for delay seconds unless stopped, returns True if stopped"""
+
+        return self._stopped.wait(delay) if delay else self.stopped
+
+    def _deliver(self, received_message):
+        """Yields a received message, if any, confirming it according to 'confirm'"""
+
+        message = received_message.receivedMessage
+
+        if message is not None:
+
+            if self.confirm == "on_receive":
+                self.client.confirm_received_message(message.messageID)
+
+            yield received_message
+
+            if self.confirm == "after_process":
+                self.client.confirm_received_message(message.messageID)
+
+    def __iter__(self):
+
+        while not self.stopped:
+            received_message = self.client.receive_message(self.business_type)
+
+            yield from self._deliver(received_message)
+
+            if self.wait(self.next_delay(received_message)):
+                return
+
+    def run(self, handler):
+        """Calls handler(received_message) for every message until stop(), confirming according to 'confirm'"""
+
+        for received_message in self:
+            handler(received_message)
+
+
+class WeightedPoller(ReceivePoller):
+    """
+    ReceiveMessage loop over several business types that shares polling between them by weight and backlog.
+
+    A business type whose last response reported remainingMessagesCount > 0 is polled again as soon as it is its turn,
+    turns are given to backlogged types in proportion to their weights (stride scheduling), and a type with higher
+    priority is always served before lower ones. Idle types back off like ReceivePoller, each with its own interval.
+    A deadline hint bounds the time between two polls of a type, so a time critical type is looked at within its
+    deadline even while other types have large backlogs.
+
+    Args:
+        client (EDX.Client): Client used for receive_message and confirm_received_message.
+        weights (dict): Business type to relative share of polls while backlogged, e.g. {"RIMD": 4, "CGM": 1}.
+        priorities (dict, optional): Business type to priority, higher is served first. Defaults to 0 for all.
+        deadlines (dict, optional): Business type to maximum seconds between its polls. Defaults to none.
+        min_interval, max_interval, backoff, jitter, confirm: As for ReceivePoller, applied to each business type.
+
+    Notes:
+        - Iterate over the poller to get receive_message results, iteration ends only after stop().
+        - backlog holds the last remainingMessagesCount seen for each business type.
+    """
+
+    def __init__(self, client, weights, priorities=None, deadlines=None, min_interval=1, max_interval=60, backoff=2,
+                 jitter=0.1, confirm="after_process"):
+
+        super().__init__(client, None, min_interval, max_interval, backoff, jitter, confirm)
+
+        self.weights = dict(weights)
+        self.priorities = priorities or {}
+        self.deadlines = deadlines or {}
+
+        now = time.monotonic()
+        self.backlog = {business_type: 0 for business_type in self.weights}
+        self.intervals = {business_type: min_interval for business_type in self.weights}
+        self._due = {business_type: now for business_type in self.weights}        # Next poll of an idle type
+        self._last_poll = {business_type: now for business_type in self.weights}
+        self._pass = {business_type: 0.0 for business_type in self.weights}         # Stride scheduling position
+        self._virtual_time = 0.0
+
+    def next_business_type(self):
+        """Returns (business_type, 0) to poll now, or (None, delay) when no type is due for delay seconds"""
+
+        now = time.monotonic()
+
+        overdue = [(self._last_poll[business_type] + deadline, business_type)
+                   for business_type, deadline in self.deadlines.items()
+                   if business_type in self.weights and now - self._last_poll[business_type] >= deadline]
+
+        if overdue:
+            return min(overdue)[1], 0
+
+        ready = [business_type for business_type in self.weights if self.backlog[business_type] or now >= self._due[business_type]]
+
+        if not ready:
+            next_poll = min(self._due.values())
+
+            for business_type, deadline in self.deadlines.items():
+                if business_type in self.weights:
+                    next_poll = min(next_poll, self._last_poll[business_type] + deadline)
+
+            return None, max(next_poll - now, 0)
+
+        for business_type in ready:
+            # A type coming back from idle starts at the current position instead of catching up on missed turns
+            self._pass[business_type] = max(self._pass[business_type], self._virtual_time)
+
+        business_type = min(ready, key=lambda business_type: (-self.priorities.get(business_type, 0), self._pass[business_type]))
+
+        self._virtual_time = self._pass[business_type]
+        self._pass[business_type] += 1 / self.weights[business_type]
+
+        return business_type, 0
+
+    def update(self, business_type, received_message):
+        """Records the result of a poll of business_type and schedules its next poll"""
+
+        now = time.monotonic()
+        self._last_poll[business_type] = now
+
+        if received_message.receivedMessage is None:
+            self.backlog[business_type] = 0
+            interval = self.intervals[business_type]
+            self._due[business_type] = now + interval * (1 + random.uniform(-self.jitter, self.jitter))
+            self.intervals[business_type] = min(interval * self.backoff, self.max_interval, self.deadlines.get(business_type, self.max_interval))
+
+        else:
+            self.backlog[business_type] = received_message.remainingMessagesCount or 0
+            self.intervals[business_type] = self.min_interval
+            self._due[business_type] = now if self.backlog[business_type] else now + self.min_interval
+
+    def __iter__(self):
+
+        while not self.stopped:
+            business_type, delay = self.next_business_type()
+
+            if business_type is None:
+                if self.wait(delay):
+                    return
+                continue
+
+            received_message = self.client.receive_message(business_type)
+            self.update(business_type, received_message)
+
+            yield from self._deliver(received_message)
+
+
+class Prefetcher(ReceivePoller):
+    """
+    Receives messages on a background thread into a bounded buffer, so the next messages download while the caller
+    processes the current one.
+
+    Up to 'depth' received messages wait in the buffer; when it is full the background thread stops receiving until
+    the caller takes one (backpressure). A message is confirmed only when the caller passes it to ack(), confirms run
+    on a separate thread so ack() does not wait for the round-trip. If the server offers a message again because it
+    is not confirmed yet (it hands out only the oldest unconfirmed message), the prefetcher notices it and from then
+    on receives the next message as soon as the previous one is confirmed, polling again at least every 'max_interval'.
+
+    Args:
+        client (EDX.Client): Client used for receive_message and confirm_received_message, shared by both threads.
+        business_type (str, optional): Business type to receive. Defaults to "*".
+        depth (int, optional): Maximum received messages waiting in the buffer. Defaults to 4.
+        min_interval, max_interval, backoff, jitter: As for ReceivePoller.
+        ack_timeout (float, optional): Seconds after which a message that is not acked is handed out again when the server
+            offers it again. Defaults to 300.
+
+    Notes:
+        - Iterate over the prefetcher to get receive_message results, iteration ends after stop() or close().
+        - Messages that are not acked stay unconfirmed and will be received again after ack_timeout.
+        - run(handler) acks every message after the handler returned.
+        - An error of the background receive is raised from the iteration.
+        - Use as context manager or call close() to stop the background thread and finish pending confirms.
+    """
+
+    def __init__(self, client, business_type="*", depth=4, min_interval=1, max_interval=60, backoff=2, jitter=0.1, ack_timeout=300):
+
+        super().__init__(client, business_type, min_interval, max_interval, backoff, jitter, confirm=None)
+
+        self.depth = depth
+        self.ack_timeout = ack_timeout
+        self.head_of_line = False  # Learned: server offers the oldest unconfirmed message again
+
+        self._buffer = queue.Queue(maxsize=depth)
+        self._outstanding = {}  # messageID to time.monotonic() when received, until confirmed
+        self._recently_confirmed = deque(maxlen=RECENTLY_CONFIRMED)
+        self._condition = threading.Condition()
+        self._error = None
+        self._confirmer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="EDX-prefetch-confirm")
+        self._receiver = threading.Thread(target=self._receive, name="EDX-prefetch", daemon=True)
+        self._receiver.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.close()
+
+    def stop(self):
+        super().stop()
+
+        with self._condition:
+            self._condition.notify_all()
+
+    def close(self):
+        """Stops receiving and waits for confirms of acked messages"""
+
+        self.stop()
+        self._receiver.join()
+        self._confirmer.shutdown(wait=True)
+
+    def ack(self, received_message):
+        """Confirms a message handed out by the iteration, returns Future of the confirm"""
+
+        message_id = received_message.receivedMessage.messageID
+
+        future = self._confirmer.submit(self.client.confirm_received_message, message_id)
+        future.add_done_callback(lambda future: self._confirmed(message_id, not future.cancelled() and future.exception() is None))
+
+        return future
+
+    def run(self, handler):
+        """Calls handler(received_message) for every message until stop() and acks it after the handler returned"""
+
+        for received_message in self:
+            handler(received_message)
+            self.ack(received_message)
+
+    def _confirmed(self, message_id, succeeded):
+
+        with self._condition:
+            self._outstanding.pop(message_id, None)
+
+            if succeeded:
+                self._recently_confirmed.append(message_id)
+
+            self._condition.notify_all()
+
+    def _wait_for_confirm(self, timeout):
+        """Waits until no received message is unconfirmed, stop() or timeout"""
+
+        with self._condition:
+            self._condition.wait_for(lambda: not self._outstanding or self.stopped, timeout)
+
+    def _receive(self):
+
+        try:
+            while not self.stopped:
+
+                if self.head_of_line:
+                    # Bounded, a message that is never acked is offered again and handed out after ack_timeout
+                    self._wait_for_confirm(self.max_interval)
+                    if self.stopped:
+                        return
+
+                received_message = self.client.receive_message(self.business_type)
+                message = received_message.receivedMessage
+
+                if message is not None:
+                    with self._condition:
+                        now = time.monotonic()
+                        received_at = self._outstanding.get(message.messageID)
+                        redelivered = received_at is not None and now - received_at < self.ack_timeout
+                        redelivered = redelivered or message.messageID in self._recently_confirmed  # Answered before the confirm landed
+
+                        if not redelivered:
+                            self._outstanding[message.messageID] = now
+
+                    if redelivered:
+                        self.head_of_line = True
+                        continue
+
+                    while not self.stopped:
+                        try:
+                            self._buffer.put(received_message, timeout=BUFFER_TIMEOUT)
+                            break
+                        except queue.Full:
+                            pass
+
+                if self.wait(self.next_delay(received_message)):
+                    return
+
+        except Exception as error:
+            self._error = error
+            self.stop()
+
+    def __iter__(self):
+
+        while True:
+            try:
+                yield self._buffer.get(timeout=BUFFER_TIMEOUT)
+            except queue.Empty:
+                if self._error is not None:
+                    raise self._error
+                if self.stopped:
+                    return
@@ -0,0 +1,221 @@
+#-------------------------------------------------------------------------------
+# Name:        status
+# Purpose:     Concurrent, adaptive CheckMessageStatus polling for many messages
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from zeep.exceptions import Fault
+
+# MessageState values after which the status of a message does not change any more
+TERMINAL_STATES = ("RECEIVED", "FAILED")
+
+# MessageState values that mean the message reached the receiver or will never reach it
+DELIVERY_STATES = ("DELIVERED", "RECEIVED", "FAILED")
+
+
+class _Tracked:
+
+    def __init__(self, message_id, future, on_change, terminal_states, interval):
+        self.message_id = message_id
+        self.future = future
+        self.on_change = on_change
+        self.terminal_states = terminal_states
+        self.interval = interval
+        self.state = None
+        self.errors = 0
+
+
+class StatusTracker:
+    """
+    Polls CheckMessageStatus for many message IDs from one scheduler thread and a small worker pool.
+
+    Each message starts with 'min_interval' between polls, multiplied by 'backoff' after every poll that shows
+    no change up to 'max_interval', and back to 'min_interval' when its state changes. So fresh messages are
+    polled fast while old ones cost little. A message stops being polled when it reaches a terminal state,
+    its future is cancelled or untrack() is called.
+
+    Args:
+        client (EDX.Client): Client used for check_message_status, may be shared with other threads.
+        min_interval (float, optional): Seconds between the first polls of a message. Defaults to 1.
+        max_interval (float, optional): Upper bound for seconds between polls. Defaults to 60.
+        backoff (float, optional): Interval multiplier after a poll without state change. Defaults to 2.
+        max_workers (int, optional): Maximum concurrent CheckMessageStatus calls. Defaults to 4.
+        max_errors (int, optional): Consecutive failed polls (other than SOAP faults) before the future fails. Defaults to 5.
+        terminal_states (tuple, optional): MessageState values that end tracking. Defaults to TERMINAL_STATES.
+        on_change (callable, optional): Called as on_change(message_id, status) on every state transition of any message.
+
+    Notes:
+        - track() returns a concurrent.futures.Future resolved with the final status or the SOAP fault.
+        - Callbacks run on worker threads, must not block for long and their exceptions are ignored.
+        - Use as context manager or call close() to stop the scheduler.
+    """
+
+    def __init__(self, client, min_interval=1, max_interval=60, backoff=2, max_workers=4, max_errors=5,
+                 terminal_states=TERMINAL_STATES, on_change=None):
+
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_errors = max_errors
+        self.terminal_states = terminal_states
+        self.on_change = on_change
+
+        self._tracked = {}
+        self._schedule = []  # heap of (due time, sequence, message_id)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="EDX-status")
+        self._scheduler = threading.Thread(target=self._run, name="EDX-status-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.close()
+
+    def track(self, message_id, on_change=None, terminal_states=None):
+        """Start polling message_id, returns Future of its final status. Tracking an already tracked ID returns the same Future.
+           'on_change' is called as on_change(message_id, status) on each state transition of this message.
+           'terminal_states' overrides the tracker default for this message."""
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("StatusTracker is closed")
+
+            tracked = self._tracked.get(message_id)
+            if tracked:
+                return tracked.future
+
+            tracked = _Tracked(message_id, Future(), on_change, terminal_states or self.terminal_states, self.min_interval)
+            self._tracked[message_id] = tracked
+            self._push(tracked, tracked.interval)
+
+        return tracked.future
+
+    def track_many(self, message_ids, on_change=None, terminal_states=None):
+        """Start polling all message_ids, returns dict of message_id to Future"""
+
+        return {message_id: self.track(message_id, on_change, terminal_states) for message_id in message_ids}
+
+    def untrack(self, message_id):
+        """Stop polling message_id, its Future is cancelled"""
+
+        with self._condition:
+            tracked = self._tracked.pop(message_id, None)
+
+        if tracked:
+            tracked.future.cancel()
+
+    def states(self):
+        """Returns dict of tracked message_id to last seen MessageState (None before the first poll)"""
+
+        with self._condition:
+            return {message_id: tracked.state for message_id, tracked in self._tracked.items()}
+
+    def close(self, cancel=True):
+        """Stops polling, pending Futures are cancelled unless cancel=False"""
+
+        with self._condition:
+            self._closed = True
+            tracked = list(self._tracked.values())
+            self._tracked.clear()
+            self._condition.notify_all()
+
+        self._scheduler.join()
+        self._executor.shutdown(wait=True)
+
+        if cancel:
+            for item in tracked:
+                item.future.cancel()
+
+    def _push(self, tracked, delay):
+        heapq.heappush(self._schedule, (time.monotonic() + delay, next(self._sequence), tracked.message_id))
+        self._condition.notify()
+
+    def _run(self):
+
+        while True:
+            with self._condition:
+
+                while not self._closed and (not self._schedule or self._schedule[0][0] > time.monotonic()):
+                    self._condition.wait(self._schedule[0][0] - time.monotonic() if self._schedule else None)
+
+                if self._closed:
+                    return
+
+                _, _, message_id = heapq.heappop(self._schedule)
+                tracked = self._tracked.get(message_id)
+
+            if tracked is None:
+                continue
+
+            if tracked.future.cancelled():
+                self.untrack(message_id)
+                continue
+
+            self._executor.submit(self._poll, tracked)
+
+    def _poll(self, tracked):
+
+        try:
+            status = self.client.check_message_status(tracked.message_id)
+
+        except Fault as error:
+            self._finish(tracked, error=error)
+            return
+
+        except Exception as error:
+            tracked.errors += 1
+            if tracked.errors >= self.max_errors:
+                self._finish(tracked, error=error)
+            else:
+                self._reschedule(tracked, changed=False)
+            return
+
+        tracked.errors = 0
+        changed = status.state != tracked.state
+        tracked.state = status.state
+
+        if changed:
+            for callback in (self.on_change, tracked.on_change):
+                if callback:
+                    try:
+                        callback(tracked.message_id, status)
+                    except Exception:
+                        pass  # A broken callback must not stop polling
+
+        if status.state in tracked.terminal_states:
+            self._finish(tracked, status=status)
+        else:
+            self._reschedule(tracked, changed)
+
+    def _reschedule(self, tracked, changed):
+        tracked.interval = self.min_interval if changed else min(tracked.interval * self.backoff, self.max_interval)
+
+        with self._condition:
+            if self._tracked.get(tracked.message_id) is tracked:
+                self._push(tracked, tracked.interval)
+
+    def _finish(self, tracked, status=None, error=None):
+
+        with self._condition:
+            if self._tracked.get(tracked.message_id) is tracked:
+                del self._tracked[tracked.message_id]
+
+        if not tracked.future.set_running_or_notify_cancel():
+            return
+
+        if error is not None:
+            tracked.future.set_exception(error)
+        else:
+            tracked.future.set_result(status)
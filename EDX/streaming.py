@@ -0,0 +1,280 @@
+#-------------------------------------------------------------------------------
+# Name:        streaming
+# Purpose:     Constant memory SendMessage/ReceiveMessage for large payloads
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import base64
+import os
+import re
+from contextlib import closing
+
+from lxml import etree
+from zeep.exceptions import Fault
+
+from EDX.fast_path import (CONTENT_TYPES, ENVELOPE_START, ENVELOPE_END, MADES_NS, RECEIVE_MESSAGE, RECEIVED_MESSAGE_FIELDS,
+                           SEND_MESSAGE_START, SEND_MESSAGE_END, SOAP_NS, Result, parse_document, response_body, _compound, _text)
+
+CHUNK_SIZE = 64 * 1024
+
+# Raw bytes encoded at a time when sending, multiple of 3 so chunks encode without padding
+ENCODE_CHUNK_SIZE = 3 * 16 * 1024
+
+_whitespace = re.compile(r"\s+")
+
+
+class _Sink:
+    """Opens path sinks lazily, so no file is created when the queue is empty"""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.file = None
+
+        if callable(sink):
+            self._write = sink
+        elif hasattr(sink, "write"):
+            self._write = sink.write
+        else:
+            self._write = None
+
+    def write(self, data):
+
+        if self._write is None:
+            self.file = open(self.sink, "wb")
+            self._write = self.file.write
+
+        self._write(data)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+class _ReceiveMessageTarget:
+    """lxml parser target that decodes the content element in chunks and keeps only the other fields"""
+
+    def __init__(self, write):
+        self.write = write
+        self.path = []
+        self.text = []
+        self.remainder = ""
+        self.in_content = False
+        self.fault = None
+        self.size = 0
+        self.received_message = None
+        self.remaining_messages_count = None
+
+    def start(self, tag, attrib):
+        name = tag.rpartition("}")[2]
+        self.path.append(name)
+        self.text = []
+
+        if tag == f"{{{SOAP_NS}}}Fault":
+            self.fault = {}
+        elif name == "receivedMessage":
+            self.received_message = Result.fromkeys(RECEIVED_MESSAGE_FIELDS)
+        elif name == "content" and self.received_message is not None:
+            self.in_content = True
+            self.write(b"")  # Creates the file also for empty content
+
+    def data(self, data):
+        if not self.in_content:
+            self.text.append(data)
+            return
+
+        data = self.remainder + _whitespace.sub("", data)
+        usable = len(data) - len(data) % 4
+        self.remainder = data[usable:]
+
+        if usable:
+            decoded = base64.b64decode(data[:usable])
+            self.size += len(decoded)
+            self.write(decoded)
+
+    def end(self, tag):
+        name = self.path.pop()
+
+        if self.in_content:
+            self.in_content = False
+            if self.remainder:
+                raise ValueError("Received content is not valid base64")
+        elif self.fault is not None:
+            self.fault[name] = self.fault.get(name) or "".join(self.text)
+        elif name == "remainingMessagesCount":
+            self.remaining_messages_count = int("".join(self.text))
+        elif self.path and self.path[-1] == "receivedMessage":
+            self.received_message[name] = "".join(self.text)
+
+    def close(self):
+        return Result(receivedMessage=self.received_message, remainingMessagesCount=self.remaining_messages_count)
+
+
+def receive_message_to_sink(transport, address, sink, business_type="*", chunk_size=CHUNK_SIZE):
+    """
+    ReceiveMessage that streams the response through an incremental parser and writes decoded content to sink.
+
+    Args:
+        transport (zeep.transports.Transport): Transport whose session and operation timeout are used.
+        address (str): Web service endpoint address.
+        sink (str/os.PathLike/file-like/callable): Path to write to, object with write() or callable taking bytes.
+        business_type (str, optional): Business type to receive. Defaults to "*".
+        chunk_size (int, optional): Bytes read from the socket at a time. Defaults to 64 KiB.
+
+    Returns:
+        Result with receivedMessage (content set to None, size in bytes of written content added) and remainingMessagesCount.
+    """
+
+    body = RECEIVE_MESSAGE.format(businessType=_text(business_type), downloadMessage="true")
+    message = b"".join((ENVELOPE_START, body.encode(), ENVELOPE_END))
+
+    response = transport.session.post(address, data=message, headers={"Content-Type": CONTENT_TYPES["ReceiveMessage"]},
+                                      timeout=transport.operation_timeout, stream=True)
+
+    with closing(response):
+
+        # Faults and MTOM packages are small or need the whole body, use the regular parser for those
+        if response.status_code != 200 or response.headers.get("Content-Type", "").startswith("multipart/related"):
+            document, attachments = parse_document(response)
+            element = response_body(document, response.status_code)
+            return _write_buffered(element, attachments, sink)
+
+        output = _Sink(sink)
+        target = _ReceiveMessageTarget(output.write)
+        parser = etree.XMLParser(target=target, resolve_entities=False, no_network=True, huge_tree=True)
+
+        try:
+            for chunk in response.iter_content(chunk_size):
+                parser.feed(chunk)
+            result = parser.close()
+        finally:
+            output.close()
+
+    if target.fault is not None:
+        raise Fault(message=target.fault.get("Text"), code=target.fault.get("Value"), actor=None, detail=None)
+
+    if result.receivedMessage is not None:
+        result.receivedMessage["size"] = target.size
+
+    return result
+
+
+def _write_buffered(element, attachments, sink):
+    result = Result(receivedMessage=None, remainingMessagesCount=None)
+
+    for child in element.iterchildren(tag=etree.Element):
+        name = child.tag.rpartition("}")[2]
+
+        if name == "receivedMessage":
+            received_message = _compound(child, RECEIVED_MESSAGE_FIELDS, attachments)
+            content = received_message["content"] or b""
+            received_message.update(content=None, size=len(content))
+
+            output = _Sink(sink)
+            try:
+                output.write(content)
+            finally:
+                output.close()
+
+            result[name] = received_message
+
+        elif name == "remainingMessagesCount":
+            result[name] = int(child.text)
+
+    return result
+
+
+class _EnvelopeStream:
+    """
+    HTTP body of a SendMessage envelope that base64 encodes the content while it is sent.
+
+    Content can be a path, a file object or any bytes-like object (bytes, memoryview, mmap). When the
+    content size is known the body has a length and is sent with Content-Length, otherwise chunked.
+    """
+
+    def __init__(self, start, content, end):
+        self.start = start
+        self.end = end
+        self.content = content
+        self.size = None
+
+        if isinstance(content, (str, os.PathLike)):
+            self.size = os.path.getsize(content)
+        elif hasattr(content, "read"):
+            if hasattr(content, "seekable") and content.seekable():
+                position = content.tell()
+                self.size = content.seek(0, os.SEEK_END) - position
+                content.seek(position)
+        else:
+            self.content = memoryview(content).cast("B")
+            self.size = len(self.content)
+
+    def __len__(self):
+        return len(self.start) + 4 * -(-self.size // 3) + len(self.end)
+
+    def _chunks(self):
+        if isinstance(self.content, memoryview):
+            for offset in range(0, self.size, ENCODE_CHUNK_SIZE):
+                yield self.content[offset:offset + ENCODE_CHUNK_SIZE]
+            return
+
+        if isinstance(self.content, (str, os.PathLike)):
+            with open(self.content, "rb") as content_file:
+                yield from self._read(content_file)
+        else:
+            yield from self._read(self.content)
+
+    def _read(self, content_file):
+        remainder = b""
+
+        while True:
+            chunk = content_file.read(ENCODE_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            chunk = remainder + chunk
+            usable = len(chunk) - len(chunk) % 3
+            remainder = chunk[usable:]
+            yield chunk[:usable]
+
+        yield remainder
+
+    def __iter__(self):
+        yield self.start
+        for chunk in self._chunks():
+            yield base64.b64encode(chunk)
+        yield self.end
+
+
+def send_message_from_file(transport, address, content, receiver_code, business_type, sender_application="", ba_message_id="", conversation_id=""):
+    """
+    SendMessage that streams the envelope and base64 encodes content in chunks, keeping memory use constant.
+
+    Args:
+        transport (zeep.transports.Transport): Transport whose session and operation timeout are used.
+        address (str): Web service endpoint address.
+        content (str/os.PathLike/file-like/bytes-like): Path, file object opened in binary mode, mmap or bytes to send.
+        receiver_code, business_type, sender_application, ba_message_id, conversation_id (str): SendMessage fields.
+
+    Returns:
+        messageID (str)
+    """
+
+    start = SEND_MESSAGE_START.format(receiverCode=_text(receiver_code), businessType=_text(business_type))
+    end = SEND_MESSAGE_END.format(senderApplication=_text(sender_application),
+                                  baMessageID=_text(ba_message_id),
+                                  conversationID=_text(conversation_id))
+
+    body = _EnvelopeStream(ENVELOPE_START + start.encode(), content, end.encode() + ENVELOPE_END)
+
+    # Without known size requests needs a plain iterator, it then uses chunked transfer encoding
+    data = body if body.size is not None else iter(body)
+
+    response = transport.session.post(address, data=data, headers={"Content-Type": CONTENT_TYPES["SendMessage"]},
+                                      timeout=transport.operation_timeout)
+
+    with closing(response):
+        document, _ = parse_document(response)
+
+    element = response_body(document, response.status_code)
+
+    return element.findtext(f"{{{MADES_NS}}}messageID") or element.findtext("messageID")
@@ -0,0 +1,282 @@
+#-------------------------------------------------------------------------------
+# Name:        tracing
+# Purpose:     Spans for Client calls with envelope build, HTTP transfer and response parse children
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import logging
+import os
+import threading
+import time
+
+try:
+    from opentelemetry import context as opentelemetry_context
+    from opentelemetry import trace as opentelemetry_trace
+except ImportError:
+    opentelemetry_context = None
+    opentelemetry_trace = None
+
+# Spans kept by the InMemoryExporter a Tracer creates when no exporter is given
+DEFAULT_MAX_SPANS = 1000
+
+# Child span names of the phases of a call
+PHASE_SPAN_NAMES = {"serialize": "EDX envelope build",
+                    "network": "EDX HTTP transfer",
+                    "parse": "EDX response parse"}
+
+_local = threading.local()
+
+
+def current_span():
+    """Returns the Span opened with Tracer.span() on this thread or None"""
+
+    return getattr(_local, "span", None)
+
+
+class Span:
+    """
+    One timed unit of work.
+
+    Attributes:
+        name (str): Span name, "EDX <operation>" for Client calls.
+        trace_id (str): 32 hex digit trace ID, shared by all spans of a trace.
+        span_id (str): 16 hex digit span ID.
+        parent_id (str): span_id of the parent span or None for a root span.
+        start_time (int): Start as nanoseconds since the epoch.
+        end_time (int): End as nanoseconds since the epoch.
+        attributes (dict): e.g. businessType, receiverCode, messageID.
+        error (str): repr of the exception that ended the span or None.
+    """
+
+    def __init__(self, name, trace_id=None, parent_id=None, start_time=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_time = start_time if start_time is not None else time.time_ns()
+        self.end_time = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    @property
+    def duration(self):
+        """Seconds between start and end"""
+
+        return (self.end_time - self.start_time) / 1e9 if self.end_time is not None else None
+
+    @property
+    def traceparent(self):
+        """W3C Trace Context header value, to continue the trace in another service"""
+
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def child(self, name, start_time=None, attributes=None):
+        return Span(name, self.trace_id, self.span_id, start_time, attributes)
+
+    def end(self, end_time=None, error=None):
+        self.end_time = end_time if end_time is not None else time.time_ns()
+        self.error = repr(error) if error is not None else None
+
+    def __repr__(self):
+        return f"Span({self.name!r}, duration={self.duration}, attributes={self.attributes})"
+
+
+class InMemoryExporter:
+    """Keeps finished spans in 'spans', for tests and inspection, only the latest 'max_spans' if given"""
+
+    def __init__(self, max_spans=None):
+        self.spans = []
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            self.spans.extend(spans)
+
+            if self.max_spans is not None and len(self.spans) > self.max_spans:
+                del self.spans[:-self.max_spans]
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+
+class LoggingExporter:
+    """Logs every finished span to the "EDX.tracing" logger at DEBUG level"""
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger("EDX.tracing")
+
+    def export(self, spans):
+        for span in spans:
+            self.logger.debug("%s %s trace_id=%s span_id=%s parent_id=%s %.1f ms %s", span.name, "ERROR" if span.error else "OK",
+                              span.trace_id, span.span_id, span.parent_id, span.duration * 1000, span.attributes)
+
+
+class OpenTelemetryExporter:
+    """
+    Creates the spans with the OpenTelemetry API, so they go wherever the application's OpenTelemetry SDK sends its spans.
+
+    A tracer.span() is a real OpenTelemetry span from start to end and is the current OpenTelemetry span inside it,
+    Client call spans become children of the OpenTelemetry span current on the calling thread. The trace_id and span_id
+    of every EDX Span are replaced by those of its OpenTelemetry span, so Span.traceparent continues the same trace.
+    Requires opentelemetry-api, install with "pip install EDX[opentelemetry]".
+    """
+
+    def __init__(self, tracer=None):
+
+        if opentelemetry_trace is None:
+            raise RuntimeError("To use OpenTelemetryExporter, install EDX with the opentelemetry extras, e.g., `pip install EDX[opentelemetry]`")
+
+        self.tracer = tracer or opentelemetry_trace.get_tracer("EDX")
+        self._open = {}  # span_id of tracer.span() spans not finished yet to (OpenTelemetry span, context token)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _use_ids(span, otel_span):
+        """Gives span the trace_id and span_id of otel_span"""
+
+        span_context = otel_span.get_span_context()
+
+        if span_context.is_valid:
+            span.trace_id = opentelemetry_trace.format_trace_id(span_context.trace_id)
+            span.span_id = opentelemetry_trace.format_span_id(span_context.span_id)
+
+    def _parent_context(self, span, created):
+        """OpenTelemetry context holding the parent of span, None for the current context"""
+
+        if span.parent_id is None:
+            return None
+
+        with self._lock:
+            parent = created.get(span.parent_id) or self._open.get(span.parent_id, (None, None))[0]
+
+        if parent is None:
+            # Parent finished or on another thread, continue the trace from its IDs
+            parent = opentelemetry_trace.NonRecordingSpan(opentelemetry_trace.SpanContext(
+                int(span.trace_id, 16), int(span.parent_id, 16), is_remote=False,
+                trace_flags=opentelemetry_trace.TraceFlags(opentelemetry_trace.TraceFlags.SAMPLED)))
+
+        return opentelemetry_trace.set_span_in_context(parent)
+
+    def _start_span(self, span, created):
+        return self.tracer.start_span(span.name, context=self._parent_context(span, created), start_time=span.start_time,
+                                      attributes={key: value for key, value in span.attributes.items() if value is not None})
+
+    def start(self, span):
+        """Starts the OpenTelemetry span of a tracer.span() and makes it current on this thread"""
+
+        otel_span = self._start_span(span, {})
+        self._use_ids(span, otel_span)
+        token = opentelemetry_context.attach(opentelemetry_trace.set_span_in_context(otel_span))
+
+        with self._lock:
+            self._open[span.span_id] = (otel_span, token)
+
+    def export(self, spans):
+
+        created = {}
+
+        for span in spans:  # Parents come before their children
+
+            with self._lock:
+                otel_span, token = self._open.pop(span.span_id, (None, None))
+
+            if otel_span is not None:
+                opentelemetry_context.detach(token)
+            else:
+                edx_span_id = span.span_id
+                otel_span = self._start_span(span, created)
+                self._use_ids(span, otel_span)
+                created[span.span_id] = otel_span
+
+                for child in spans:
+                    if child.parent_id == edx_span_id:
+                        child.parent_id = span.span_id
+
+            if span.error:
+                otel_span.set_status(opentelemetry_trace.Status(opentelemetry_trace.StatusCode.ERROR, span.error))
+
+            otel_span.end(end_time=span.end_time)
+
+
+class Tracer:
+    """
+    Turns every Client call into a span with child spans for envelope build, HTTP transfer and response parse.
+
+    Passed as Client(tracer=...) it observes the Client instrumentation, so spans carry the same timing and attributes
+    (businessType, receiverCode, messageID, body sizes) as the "EDX" log records. Finished spans of a call are handed
+    together to exporter.export(spans), parent first.
+
+    Args:
+        exporter (object, optional): Object with export(spans), e.g. InMemoryExporter, LoggingExporter or OpenTelemetryExporter.
+            Defaults to InMemoryExporter(max_spans=DEFAULT_MAX_SPANS), keeping only the latest spans.
+
+    Notes:
+        - Open your own spans with "with tracer.span(name):", Client calls made inside become their children.
+        - Span.traceparent gives the W3C header value to pass the trace on to downstream processing.
+        - An exporter may also have start(span), called when a tracer.span() opens, before the span is exported at its end.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter or InMemoryExporter(max_spans=DEFAULT_MAX_SPANS)
+
+    def span(self, name, **attributes):
+        """Context manager opening a span on this thread, parent of spans started inside it"""
+
+        return _SpanContext(self, name, attributes)
+
+    def observe(self, operation):
+        """Instrumentation observer creating the spans of a finished Operation"""
+
+        # Operation timing is in perf_counter seconds, anchor it to wall clock time now
+        offset = time.time_ns() - int(time.perf_counter() * 1e9)
+
+        def wall_time(perf_time):
+            return offset + int(perf_time * 1e9)
+
+        parent = current_span()
+        attributes = dict(operation.attributes, request_bytes=operation.request_bytes, response_bytes=operation.response_bytes)
+
+        if parent is not None:
+            root = parent.child(f"EDX {operation.name}", wall_time(operation.started), attributes)
+        else:
+            root = Span(f"EDX {operation.name}", start_time=wall_time(operation.started), attributes=attributes)
+
+        children = []
+
+        for phase, start, end in operation.intervals:
+            child = root.child(PHASE_SPAN_NAMES[phase], wall_time(start))
+            child.end(wall_time(end))
+            children.append(child)
+
+        root.end(wall_time(operation.started + operation.duration), operation.error)
+
+        self.exporter.export([root] + children)
+
+
+class _SpanContext:
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+        self.outer = None
+
+    def __enter__(self):
+        self.outer = current_span()
+        self.span = self.outer.child(self.name, attributes=self.attributes) if self.outer else Span(self.name, attributes=self.attributes)
+
+        start = getattr(self.tracer.exporter, "start", None)
+        if start is not None:
+            start(self.span)
+
+        _local.span = self.span
+        return self.span
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        _local.span = self.outer
+        self.span.end(error=exc_value)
+        self.tracer.exporter.export([self.span])
+        return False
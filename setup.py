@@ -1,15 +1,39 @@
+import os
+
 from setuptools import setup
+from setuptools.command.egg_info import egg_info
 import versioneer
 
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
+version = versioneer.get_version()
+
+BUILD_VERSION_PY = """# This file is generated by setup.py at build time, do not edit or commit.
+# It lets "import EDX" read the version without running git.
+version = {!r}
+"""
+
+
+class cmd_egg_info(egg_info):
+    """Bakes the version into EDX/_build_version.py, egg_info runs for sdist, wheel and editable installs"""
+
+    def run(self):
+        with open(os.path.join("EDX", "_build_version.py"), "w") as version_file:
+            version_file.write(BUILD_VERSION_PY.format(version))
+        super().run()
+
+
+cmdclass = versioneer.get_cmdclass()
+cmdclass["egg_info"] = cmd_egg_info
+
 setup(
     name='EDX',
     #version='0.0.7',
-    version=versioneer.get_version().split("+")[0],
-    cmdclass=versioneer.get_cmdclass(),
+    version=version.split("+")[0],
+    cmdclass=cmdclass,
     packages=['EDX'],
+    package_data={'EDX': ['wsdl/*.wsdl', 'wsdl/*.xsd']},
     long_description=long_description,
     long_description_content_type="text/markdown",
     url='https://github.com/Haigutus/EDX',
@@ -18,8 +42,12 @@ setup(
     author_email='kristjan.vilgo@gmail.com',
     description='EDX MADES SOAP API implementation in python',
     install_requires=[
-        "requests", "zeep", 'urllib3', 'lxml'
+        "requests", "zeep", 'urllib3', 'lxml', 'isodate', 'requests-toolbelt'
     ],
+    extras_require={
+        "async": ["httpx"],
+        "opentelemetry": ["opentelemetry-api"]
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,9 @@
+import pytest
+
+from tests.standin import StandinServer
+
+
+@pytest.fixture
+def server():
+    with StandinServer() as standin:
+        yield standin
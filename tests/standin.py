@@ -0,0 +1,376 @@
+#-------------------------------------------------------------------------------
+# Name:        standin
+# Purpose:     Local stand-in MADES server for tests and benchmarks
+#
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+import base64
+import hashlib
+import itertools
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import EDX
+from EDX.fast_path import MADES_NS, SOAP_NS
+
+WSDL_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(EDX.__file__)), "wsdl")
+
+ENVELOPE = f'<?xml version="1.0" encoding="utf-8"?><soap:Envelope xmlns:soap="{SOAP_NS}"><soap:Body>{{}}</soap:Body></soap:Envelope>'
+
+# Synthetic payloads repeat one block, its size is a multiple of 3 so the base64 of the payload is the base64 of the block repeated
+SYNTHETIC_BLOCK = hashlib.sha256(b"EDX").digest() * 6144
+SYNTHETIC_BLOCK_BASE64 = base64.b64encode(SYNTHETIC_BLOCK)
+
+STATUS_STATES = ("ACCEPTED", "DELIVERING", "DELIVERED")
+
+FIELD = re.compile(rb"<(?:[\w.-]+:)?(\w+)>([^<]*)</(?:[\w.-]+:)?\1>")
+OPERATION = re.compile(rb"<(?:[\w.-]+:)?(\w+)Request[\s>]")
+
+
+def synthetic_chunks(size):
+    """Yields size bytes of synthetic payload in blocks, without holding it in memory"""
+
+    blocks, rest = divmod(size, len(SYNTHETIC_BLOCK))
+
+    for _ in range(blocks):
+        yield SYNTHETIC_BLOCK
+
+    if rest:
+        yield SYNTHETIC_BLOCK[:rest]
+
+
+def synthetic_sha256(size):
+    """sha256 hexdigest of synthetic_chunks(size)"""
+
+    digest = hashlib.sha256()
+
+    for chunk in synthetic_chunks(size):
+        digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class StandinMessage:
+    """
+    Message waiting on the stand-in server.
+
+    Attributes:
+        message_id (str), business_type (str), sender (str), ba_message_id (str): Fields of the receivedMessage.
+        content (bytes): Payload, or None for a synthetic payload of 'size' bytes.
+        size (int): Payload size in bytes.
+        delivered (float): time.monotonic() of the last ReceiveMessage that returned it, None if never returned.
+    """
+
+    def __init__(self, message_id, business_type, content=b"", sender="10X1001A1001A39W", ba_message_id="", size=None):
+        self.message_id = message_id
+        self.business_type = business_type
+        self.sender = sender
+        self.ba_message_id = ba_message_id
+        self.content = None if size is not None else content
+        self.size = size if size is not None else len(content)
+        self.delivered = None
+
+    def __repr__(self):
+        return f"StandinMessage({self.message_id!r}, {self.business_type!r}, size={self.size})"
+
+
+class StandinServer:
+    """
+    Threaded HTTP server answering the five MADES operations like an EDX toolbox, for tests and benchmarks.
+
+    Sent messages are kept in 'sent', messages added with add_message() are returned by ReceiveMessage until confirmed.
+    CheckMessageStatus walks through ACCEPTED, DELIVERING and DELIVERED on successive calls. The bundled WSDL is served
+    on /ws/madesInWSInterface.wsdl, so clients can be created with and without offline=True.
+
+    Args:
+        delay (float, optional): Seconds every operation waits before answering, to emulate network latency. Defaults to 0.
+        head_of_line (bool, optional): ReceiveMessage returns the oldest unconfirmed message again until it is confirmed.
+            If False, a returned message is skipped until it is confirmed or 'redeliver_after' seconds have passed. Defaults to True.
+        redeliver_after (float, optional): Seconds after which an unconfirmed message is returned again when head_of_line is False. Defaults to None (never).
+        port (int, optional): Port to listen on at 127.0.0.1. Defaults to 0 (any free port).
+
+    Attributes:
+        url (str): Server address to pass to EDX.Client, set by start().
+        sent (list): dict per received SendMessage with receiverCode, businessType, content, baMessageID and messageID.
+        confirmed (list): Confirmed message IDs, in order.
+        calls (dict): Number of requests per operation name.
+        connections (int): Number of TCP connections accepted.
+
+    Notes:
+        - Use as "with StandinServer() as server:", or call start() and stop().
+        - fail(operation, times) makes the next calls of an operation answer with a MADES SOAP fault.
+    """
+
+    def __init__(self, delay=0, head_of_line=True, redeliver_after=None, port=0):
+        self.delay = delay
+        self.port = port
+        self.head_of_line = head_of_line
+        self.redeliver_after = redeliver_after
+        self.url = None
+        self.sent = []
+        self.confirmed = []
+        self.calls = {}
+        self.connections = 0
+        self.lock = threading.Lock()
+        self._messages = []
+        self._faults = {}
+        self._statuses = {}
+        self._ids = itertools.count(1)
+        self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.stop()
+
+    def start(self):
+
+        handler = type("StandinHandler", (_Handler,), {"standin": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+        threading.Thread(target=self._server.serve_forever, name="EDX-standin", daemon=True).start()
+
+        return self
+
+    def stop(self):
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def add_message(self, business_type="RIMD", content=b"", sender="10X1001A1001A39W", ba_message_id="", size=None):
+        """Queues a message for ReceiveMessage, with content or a synthetic payload of 'size' bytes. Returns its messageID."""
+
+        with self.lock:
+            message = StandinMessage(f"in-{next(self._ids)}", business_type, content, sender, ba_message_id, size)
+            self._messages.append(message)
+
+        return message.message_id
+
+    @property
+    def waiting(self):
+        """Message IDs not yet confirmed, oldest first"""
+
+        with self.lock:
+            return [message.message_id for message in self._messages]
+
+    def fail(self, operation, times=1):
+        """Answers the next 'times' calls of operation (e.g. "SendMessage") with a <operation>Error SOAP fault"""
+
+        with self.lock:
+            self._faults[operation] = self._faults.get(operation, 0) + times
+
+    def _take_fault(self, operation):
+
+        with self.lock:
+            if self._faults.get(operation):
+                self._faults[operation] -= 1
+                return True
+
+        return False
+
+    def _next_message(self, business_type, download):
+        """Returns (message, remaining count) for ReceiveMessage"""
+
+        now = time.monotonic()
+
+        with self.lock:
+            matching = [message for message in self._messages if business_type in ("*", message.business_type)]
+
+            if not self.head_of_line:
+                matching = [message for message in matching if message.delivered is None
+                            or (self.redeliver_after is not None and now - message.delivered >= self.redeliver_after)]
+
+            if not matching:
+                return None, 0
+
+            message = matching[0]
+
+            if download:
+                message.delivered = now
+
+            return message, len(matching) - 1
+
+    def _confirm(self, message_id):
+
+        with self.lock:
+            messages = [message for message in self._messages if message.message_id != message_id]
+
+            if len(messages) == len(self._messages):
+                return False
+
+            self._messages = messages
+            self.confirmed.append(message_id)
+
+        return True
+
+    def _status(self, message_id):
+
+        with self.lock:
+            calls = self._statuses[message_id] = self._statuses.get(message_id, 0) + 1
+
+        return STATUS_STATES[min(calls, len(STATUS_STATES)) - 1]
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    standin = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+
+        with self.standin.lock:
+            self.standin.connections += 1
+
+    def do_GET(self):
+
+        path = os.path.join(WSDL_DIRECTORY, os.path.basename(self.path))
+
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        with open(path, "rb") as document:
+            data = document.read()
+
+        self._respond(200, data, "text/xml")
+
+    def _read_body(self):
+
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+
+                if not size:
+                    self.rfile.readline()
+                    break
+
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+
+            return b"".join(chunks)
+
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+
+        standin = self.standin
+        body = self._read_body()
+        operation = OPERATION.search(body).group(1).decode()
+
+        with standin.lock:
+            standin.calls[operation] = standin.calls.get(operation, 0) + 1
+
+        if standin.delay:
+            time.sleep(standin.delay)
+
+        if standin._take_fault(operation):
+            self._fault(operation, "Failure injected by stand-in server")
+            return
+
+        fields = {name.decode(): value.decode() for name, value in FIELD.findall(body)}
+
+        if operation == "SendMessage":
+            content = re.search(rb"<(?:[\w.-]+:)?content>([^<]*)<", body)
+            message_id = f"out-{next(standin._ids)}"
+
+            with standin.lock:
+                standin.sent.append(dict(fields, content=base64.b64decode(content.group(1) if content else b""), messageID=message_id))
+
+            self._answer(f"<ns:SendMessageResponse xmlns:ns=\"{MADES_NS}\"><ns:messageID>{message_id}</ns:messageID></ns:SendMessageResponse>")
+
+        elif operation == "ConnectivityTest":
+            self._answer(f"<ns:ConnectivityTestResponse xmlns:ns=\"{MADES_NS}\"><ns:messageID>test-{next(standin._ids)}</ns:messageID></ns:ConnectivityTestResponse>")
+
+        elif operation == "ConfirmReceiveMessage":
+            message_id = fields.get("messageID")
+
+            if not standin._confirm(message_id):
+                self._fault(operation, f"Message {message_id} not found")
+                return
+
+            self._answer(f"<ns:ConfirmReceiveMessageResponse xmlns:ns=\"{MADES_NS}\"><ns:messageID>{message_id}</ns:messageID></ns:ConfirmReceiveMessageResponse>")
+
+        elif operation == "CheckMessageStatus":
+            message_id = fields.get("messageID")
+            self._answer(f"<ns:CheckMessageStatusResponse xmlns:ns=\"{MADES_NS}\"><ns:messageStatus><ns:messageID>{message_id}</ns:messageID>"
+                         f"<ns:state>{standin._status(message_id)}</ns:state><ns:receiverCode>10V000000000011Q</ns:receiverCode>"
+                         "<ns:senderCode>10X1001A1001A39W</ns:senderCode><ns:businessType>RIMD</ns:businessType>"
+                         "<ns:sendTimestamp>2024-01-01T00:00:00Z</ns:sendTimestamp></ns:messageStatus></ns:CheckMessageStatusResponse>")
+
+        elif operation == "ReceiveMessage":
+            download = fields.get("downloadMessage") == "true"
+            message, remaining = standin._next_message(fields.get("businessType", "*"), download)
+
+            if message is None:
+                self._answer(f"<ns:ReceiveMessageResponse xmlns:ns=\"{MADES_NS}\"><ns:remainingMessagesCount>0</ns:remainingMessagesCount></ns:ReceiveMessageResponse>")
+                return
+
+            start = (f"<ns:ReceiveMessageResponse xmlns:ns=\"{MADES_NS}\"><ns:receivedMessage><ns:messageID>{message.message_id}</ns:messageID>"
+                     f"<ns:receiverCode>10V000000000011Q</ns:receiverCode><ns:senderCode>{message.sender}</ns:senderCode>"
+                     f"<ns:businessType>{message.business_type}</ns:businessType>")
+            end = (f"<ns:baMessageID>{message.ba_message_id}</ns:baMessageID></ns:receivedMessage>"
+                   f"<ns:remainingMessagesCount>{remaining}</ns:remainingMessagesCount></ns:ReceiveMessageResponse>")
+
+            if not download:
+                self._answer(start + end)
+            elif message.content is not None:
+                self._answer(start + f"<ns:content>{base64.b64encode(message.content).decode()}</ns:content>" + end)
+            else:
+                self._answer_synthetic(start + "<ns:content>", message.size, "</ns:content>" + end)
+
+        else:
+            self.send_error(400)
+
+    def _answer(self, body):
+        self._respond(200, ENVELOPE.format(body).encode(), "application/soap+xml; charset=utf-8")
+
+    def _answer_synthetic(self, start, size, end):
+        """Writes a response with a synthetic base64 payload of size bytes, encoded block by block"""
+
+        head, tail = ENVELOPE.encode().split(b"{}")
+        start, end = head + start.encode(), end.encode() + tail
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/soap+xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(start) + 4 * -(-size // 3) + len(end)))
+        self.end_headers()
+
+        try:
+            self.wfile.write(start)
+
+            for chunk in synthetic_chunks(size):
+                self.wfile.write(SYNTHETIC_BLOCK_BASE64 if chunk is SYNTHETIC_BLOCK else base64.b64encode(chunk))
+
+            self.wfile.write(end)
+
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # Client stopped reading, e.g. max_message_size
+
+    def _fault(self, operation, text):
+        body = (f"<soap:Fault><soap:Code><soap:Value>soap:Receiver</soap:Value></soap:Code>"
+                f"<soap:Reason><soap:Text xml:lang=\"en\">{text}</soap:Text></soap:Reason>"
+                f"<soap:Detail><ns:{operation}Error xmlns:ns=\"{MADES_NS}\"><ns:errorCode>STANDIN</ns:errorCode>"
+                f"<ns:errorMessage>{text}</ns:errorMessage></ns:{operation}Error></soap:Detail></soap:Fault>")
+        self._respond(500, ENVELOPE.format(body).encode(), "application/soap+xml; charset=utf-8")
+
+    def _respond(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
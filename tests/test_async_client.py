@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+import EDX
+
+httpx = pytest.importorskip("httpx")
+
+
+def test_send_and_receive(server):
+    server.add_message("RIMD", content=b"<schedule/>")
+
+    async def exchange():
+        async with EDX.AsyncClient(server.url, offline=True) as service:
+            message_ids = await asyncio.gather(*[service.send_message("10V000000000011Q", "RIMD", b"<a/>") for _ in range(5)])
+            message = await service.receive_message("RIMD")
+            await service.confirm_received_message(message.receivedMessage.messageID)
+            return message_ids, message
+
+    message_ids, message = asyncio.run(exchange())
+
+    assert len(set(message_ids)) == 5
+    assert message.receivedMessage.content == b"<schedule/>"
+    assert server.waiting == []
+
+
+@pytest.mark.parametrize("username, auth, expected", [("user", None, httpx.BasicAuth),
+                                                      ("user", httpx.DigestAuth("user", "secret"), httpx.DigestAuth)])
+def test_auth_wins_over_username(server, username, auth, expected):
+    service = EDX.AsyncClient(server.url, username=username, password="secret", auth=auth, offline=True)
+
+    assert isinstance(service.http_client.auth, expected)
+    asyncio.run(service.aclose())
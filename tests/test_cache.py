@@ -0,0 +1,65 @@
+import functools
+import os
+import shutil
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from zeep.settings import Settings
+from zeep.transports import Transport
+
+from EDX.cache import CachingTransport, WSDLCache, load_document
+from EDX.MADES_SOAP_API import BUNDLED_WSDL
+
+
+@pytest.fixture
+def wsdl_directory(tmp_path):
+    for name in ("madesInWSInterface.wsdl", "madesInWSInterface.xsd"):
+        shutil.copy(os.path.join(os.path.dirname(BUNDLED_WSDL), name), tmp_path / name)
+
+    return tmp_path
+
+
+def change_xsd(directory):
+    path = directory / "madesInWSInterface.xsd"
+
+    with open(path, "ab") as xsd:
+        xsd.write(b"<!-- changed -->\n")
+
+    modified = os.path.getmtime(path) + 10  # Last-Modified has one second resolution
+    os.utime(path, (modified, modified))
+
+
+def test_document_shared_until_imported_xsd_changes(wsdl_directory):
+    wsdl = str(wsdl_directory / "madesInWSInterface.wsdl")
+
+    first = load_document(wsdl, Transport(), Settings())
+    assert load_document(wsdl, Transport(), Settings()) is first
+    assert load_document(wsdl, Transport(), Settings(xml_huge_tree=True)) is not first
+
+    change_xsd(wsdl_directory)
+    changed = load_document(wsdl, Transport(), Settings())
+
+    assert changed is not first
+    assert load_document(wsdl, Transport(), Settings()) is changed
+
+
+def test_imported_xsd_revalidated_over_http(wsdl_directory, tmp_path_factory):
+    handler = functools.partial(type("QuietHandler", (SimpleHTTPRequestHandler,), {"log_message": lambda *args: None}),
+                                directory=str(wsdl_directory))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        wsdl = f"http://127.0.0.1:{server.server_address[1]}/madesInWSInterface.wsdl"
+        cache = WSDLCache(str(tmp_path_factory.mktemp("cache")), ttl=0)
+
+        first = load_document(wsdl, CachingTransport(cache), Settings())
+        assert load_document(wsdl, CachingTransport(cache), Settings()) is first
+
+        change_xsd(wsdl_directory)
+        assert load_document(wsdl, CachingTransport(cache), Settings()) is not first
+
+    finally:
+        server.shutdown()
+        server.server_close()
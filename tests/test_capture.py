@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import random
+import threading
+
+import EDX
+from EDX.capture import ExchangeCapture, shrink
+
+
+def test_payload_truncated_with_size_and_hash(server):
+    content = bytes(range(256)) * 400
+    encoded = base64.b64encode(content)
+    capture = ExchangeCapture(max_payload=100)
+    service = EDX.Client(server.url, offline=True, debug=capture)
+
+    service.send_message("10V000000000011Q", "RIMD", content)
+
+    exchange = capture.last()
+    marker = f"...[{len(encoded)} bytes sha256={hashlib.sha256(encoded).hexdigest()}]".encode()
+
+    assert encoded[:100] + marker in exchange.request_body
+    assert encoded[100:200] not in exchange.request_body
+    assert exchange.request_size > len(encoded)
+    assert exchange.response_envelope is not None
+    assert exchange.request_text(pretty=True).count("\n") > 1
+
+
+def test_shrink_limits():
+    small = b"<a><content>abc</content></a>"
+    assert shrink(small, max_payload=1024) is small
+
+    body = b"<a>" + b"x" * 500 + b"</a>"
+    assert shrink(body, max_payload=10, max_body=100) == body[:100] + b"...[407 more bytes]"
+
+    body = b"<content>" + b"y" * 50 + b"</content>"
+    assert shrink(body, max_payload=10, hash_payload=False) == b"<content>" + b"y" * 10 + b"...[50 bytes]</content>"
+
+
+def test_sample_rate(server):
+    random.seed(1)
+    none = ExchangeCapture(sample_rate=0, maxlen=100)
+    half = ExchangeCapture(sample_rate=0.5, maxlen=100)
+
+    for capture in (none, half):
+        service = EDX.Client(server.url, offline=True, debug=capture)
+        for _ in range(40):
+            service.receive_message("RIMD")
+
+    assert none.exchanges() == []
+    assert 8 <= len(half.exchanges()) <= 32
+
+
+def test_ring_buffer_per_thread(server):
+    capture = ExchangeCapture(maxlen=3)
+    service = EDX.Client(server.url, offline=True, debug=capture)
+    seen = {}
+
+    def work(name, count):
+        for index in range(count):
+            service.check_message_status(f"{name}-{index}")
+        seen[name] = [exchange.request_text() for exchange in capture.exchanges()]
+
+    threads = [threading.Thread(target=work, args=(name, count)) for name, count in (("first", 5), ("second", 2))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(seen["first"]) == 3 and all("first-" in text for text in seen["first"])
+    assert "first-4" in seen["first"][-1] and "first-1" not in "".join(seen["first"])
+    assert len(seen["second"]) == 2 and all("second-" in text for text in seen["second"])
+    assert capture.exchanges() == []
+
+
+def test_streamed_response_not_kept(server, tmp_path):
+    server.add_message("CGM", content=b"<model/>")
+    capture = ExchangeCapture()
+    service = EDX.Client(server.url, offline=True, debug=capture)
+
+    service.receive_message_to_file(str(tmp_path / "model.xml"), "CGM")
+
+    exchange = capture.last()
+    assert exchange.response_body is None
+    assert exchange.response_text() == "[streamed body not captured]"
@@ -0,0 +1,53 @@
+from concurrent.futures import TimeoutError
+
+import pytest
+
+import EDX
+from EDX.status import DELIVERY_STATES, StatusTracker
+
+
+@pytest.fixture
+def service(server):
+    with EDX.Client(server.url, offline=True) as client:
+        client.status_tracker = StatusTracker(client, min_interval=0.01, max_interval=0.05, terminal_states=DELIVERY_STATES)
+        yield client
+
+
+def test_send_message_future(service):
+    delivery = service.send_message("10V000000000011Q", "RIMD", b"<schedule/>", future=True)
+
+    assert delivery.message_id.startswith("out-")
+    assert delivery.result(timeout=10).state == "DELIVERED"
+
+
+def test_send_message_futures_share_tracker(service):
+    deliveries = [service.send_message("10V000000000011Q", "RIMD", b"<schedule/>", future=True) for _ in range(5)]
+
+    assert [delivery.result(timeout=10).messageID for delivery in deliveries] == [delivery.message_id for delivery in deliveries]
+
+
+def test_send_message_wait(service):
+    status = service.send_message("10V000000000011Q", "RIMD", b"<schedule/>", wait=True, timeout=10)
+
+    assert status.state == "DELIVERED"
+
+
+def test_send_message_wait_timeout_stops_polling(service):
+    service.status_tracker.close()
+    service.status_tracker = StatusTracker(service, min_interval=0.01, terminal_states=("RECEIVED",))  # Never reached on the stand-in
+
+    with pytest.raises(TimeoutError) as error:
+        service.send_message("10V000000000011Q", "RIMD", b"<schedule/>", wait=True, timeout=0.2)
+
+    assert error.value.message_id.startswith("out-")
+    assert service.status_tracker.states() == {}
+
+
+def test_close_stops_status_tracker(server):
+    with EDX.Client(server.url, offline=True) as service:
+        service.status_tracker = StatusTracker(service, min_interval=60, terminal_states=DELIVERY_STATES)
+        tracker = service.status_tracker
+        delivery = service.send_message("10V000000000011Q", "RIMD", b"<schedule/>", future=True)
+
+    assert delivery.cancelled()
+    assert not tracker._scheduler.is_alive()
@@ -0,0 +1,184 @@
+import threading
+import time
+
+import pytest
+
+import EDX
+from tests.standin import StandinServer
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not met in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def dispatcher_thread():
+    threads = []
+
+    def start(dispatcher):
+        thread = threading.Thread(target=dispatcher.run, daemon=True)
+        thread.start()
+        threads.append((dispatcher, thread))
+        return thread
+
+    yield start
+
+    for dispatcher, thread in threads:
+        dispatcher.stop()
+        thread.join(10)
+
+
+def slow_handler(handled, seconds):
+    def handler(received_message):
+        time.sleep(seconds)
+        handled.append((time.monotonic(), received_message.receivedMessage.messageID))
+    return handler
+
+
+def test_full_route_does_not_stall_catch_all(dispatcher_thread):
+    cgm, other = [], []
+
+    with StandinServer(head_of_line=False, redeliver_after=0.2) as server:
+        for index in range(3):
+            server.add_message("CGM", content=b"<model/>")
+            server.add_message("RIMD", content=b"<schedule/>")
+            server.add_message("RIMD", content=b"<schedule/>")
+
+        service = EDX.Client(server.url, offline=True, pool_maxsize=4)
+        dispatcher = EDX.Dispatcher(service, min_interval=0.01, max_interval=0.05)
+        dispatcher.register(slow_handler(cgm, 0.6), "CGM", max_queue=1)
+        dispatcher.register(slow_handler(other, 0))
+
+        started = time.monotonic()
+        dispatcher_thread(dispatcher)
+
+        wait_for(lambda: len(other) == 6)
+        assert other[-1][0] - started < 0.6  # All RIMD handled before the first CGM finished
+
+        wait_for(lambda: len(cgm) == 3)
+        wait_for(lambda: server.waiting == [])
+
+    assert len(set(message_id for _, message_id in cgm)) == 3
+
+
+def test_dedicated_business_types_polled_next_to_catch_all(dispatcher_thread):
+    cgm, rimd, other = [], [], []
+
+    with StandinServer(head_of_line=True) as server:
+        server.add_message("CGM", content=b"<model/>")
+        server.add_message("CGM", content=b"<model/>")
+        server.add_message("RIMD", content=b"<schedule/>")
+        server.add_message("RIMD", content=b"<schedule/>")
+        server.add_message("REPORT", content=b"<report/>")
+
+        service = EDX.Client(server.url, offline=True, pool_maxsize=4)
+        dispatcher = EDX.Dispatcher(service, min_interval=0.01, max_interval=0.05)
+        dispatcher.register(slow_handler(cgm, 0.4), "CGM", max_queue=1)
+        dispatcher.register(slow_handler(rimd, 0), "RIMD")
+        dispatcher.register(slow_handler(other, 0))
+        dispatcher_thread(dispatcher)
+
+        wait_for(lambda: len(rimd) == 2)
+        assert cgm == []
+
+        wait_for(lambda: server.waiting == [])
+
+    assert (len(cgm), len(rimd), len(other)) == (2, 2, 1)
+
+
+def test_unmatched_message_is_reported_once(dispatcher_thread):
+    handled, errors = [], []
+
+    with StandinServer(head_of_line=False, redeliver_after=0.05) as server:
+        unmatched_id = server.add_message("RIMD", content=b"<schedule/>", sender="10XOTHERSENDER-X")
+        matched_id = server.add_message("RIMD", content=b"<schedule/>", sender="10X1001A1001A39W")
+
+        service = EDX.Client(server.url, offline=True)
+        dispatcher = EDX.Dispatcher(service, min_interval=0.01, max_interval=0.05,
+                                    on_error=lambda received_message, error: errors.append((received_message.receivedMessage.messageID, error)))
+        dispatcher.register(slow_handler(handled, 0), "RIMD", sender="10X1001A1001A39W")
+        thread = dispatcher_thread(dispatcher)
+
+        wait_for(lambda: len(handled) == 1)
+        time.sleep(0.3)  # The unmatched message is redelivered meanwhile
+
+        assert thread.is_alive()
+        assert [message_id for _, message_id in handled] == [matched_id]
+        assert [(message_id, type(error)) for message_id, error in errors] == [(unmatched_id, LookupError)]
+        assert server.waiting == [unmatched_id]
+
+
+def failing_handler(calls, failures):
+    def handler(received_message):
+        calls.append((time.monotonic(), received_message.receivedMessage.messageID))
+        if len(calls) <= failures:
+            raise ValueError("Handler failed")
+    return handler
+
+
+def test_failed_handler_retried_with_backoff(dispatcher_thread):
+    calls, errors = [], []
+
+    with StandinServer(head_of_line=True) as server:
+        message_id = server.add_message("RIMD", content=b"<schedule/>")
+
+        service = EDX.Client(server.url, offline=True)
+        dispatcher = EDX.Dispatcher(service, min_interval=0.01, max_interval=0.05, retry_interval=0.1, backoff=2,
+                                    on_error=lambda received_message, error: errors.append(error))
+        dispatcher.register(failing_handler(calls, 2), "RIMD")
+        dispatcher_thread(dispatcher)
+
+        wait_for(lambda: server.confirmed == [message_id])
+
+    assert len(calls) == 3
+    assert [type(error) for error in errors] == [ValueError, ValueError]
+    assert calls[1][0] - calls[0][0] >= 0.1
+    assert calls[2][0] - calls[1][0] >= 0.2
+
+
+def test_message_given_up_goes_to_dead_letter(dispatcher_thread):
+    calls, handled, dead = [], [], []
+
+    with StandinServer(head_of_line=True) as server:
+        poison_id = server.add_message("RIMD", content=b"<poison/>")
+        next_id = server.add_message("RIMD", content=b"<schedule/>")
+
+        def handler(received_message):
+            if received_message.receivedMessage.messageID == poison_id:
+                calls.append(poison_id)
+                raise ValueError("Handler failed")
+            handled.append(received_message.receivedMessage.messageID)
+
+        service = EDX.Client(server.url, offline=True)
+        dispatcher = EDX.Dispatcher(service, min_interval=0.01, max_interval=0.05, retry_interval=0.01,
+                                    dead_letter=lambda received_message, error: dead.append((received_message.receivedMessage.messageID, error)))
+        dispatcher.register(handler, "RIMD")
+        dispatcher_thread(dispatcher)
+
+        wait_for(lambda: handled == [next_id])
+
+    assert len(calls) == 3
+    assert [(message_id, type(error)) for message_id, error in dead] == [(poison_id, ValueError)]
+    assert server.confirmed == [poison_id, next_id]
+
+
+def test_message_given_up_without_dead_letter_is_not_dispatched_again(dispatcher_thread):
+    calls = []
+
+    with StandinServer(head_of_line=True) as server:
+        message_id = server.add_message("RIMD", content=b"<poison/>")
+
+        service = EDX.Client(server.url, offline=True)
+        dispatcher = EDX.Dispatcher(service, min_interval=0.01, max_interval=0.05, retry_interval=0.01, max_attempts=2)
+        dispatcher.register(failing_handler(calls, 10), "RIMD")
+        dispatcher_thread(dispatcher)
+
+        wait_for(lambda: len(calls) == 2)
+        time.sleep(0.3)
+
+        assert len(calls) == 2
+        assert server.waiting == [message_id]
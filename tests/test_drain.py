@@ -0,0 +1,64 @@
+import pytest
+
+import EDX
+from tests.standin import StandinServer
+
+
+@pytest.mark.parametrize("confirm", ["after_process", "on_receive"])
+def test_drain_head_of_line_downloads_each_message_once_after_detection(confirm):
+
+    with StandinServer(head_of_line=True, delay=0.005) as server:
+        message_ids = [server.add_message("RIMD", content=f"<schedule>{index}</schedule>".encode()) for index in range(20)]
+
+        service = EDX.Client(server.url, offline=True)
+        drained = [received_message.receivedMessage.messageID for received_message in service.drain("RIMD", confirm=confirm)]
+
+        assert drained == message_ids
+        assert server.confirmed == message_ids
+        assert server.calls["ReceiveMessage"] <= len(message_ids) + 1  # At most one redelivery before it is detected
+
+
+def test_drain_without_head_of_line():
+
+    with StandinServer(head_of_line=False) as server:
+        message_ids = [server.add_message("RIMD", content=b"<schedule/>") for _ in range(5)]
+
+        service = EDX.Client(server.url, offline=True)
+        drained = [received_message.receivedMessage.messageID for received_message in service.drain()]
+
+        assert drained == message_ids
+        assert server.calls["ReceiveMessage"] == len(message_ids)
+        assert server.waiting == []
+
+
+def test_drain_break_leaves_message_unconfirmed(server):
+    message_ids = [server.add_message("RIMD", content=b"<schedule/>") for _ in range(3)]
+    service = EDX.Client(server.url, offline=True)
+
+    for received_message in service.drain():
+        if received_message.receivedMessage.messageID == message_ids[1]:
+            break
+
+    assert server.confirmed == message_ids[:1]
+
+
+def test_drain_raises_confirm_error(server):
+    server.add_message("RIMD", content=b"<schedule/>")
+    server.add_message("RIMD", content=b"<schedule/>")
+    server.fail("ConfirmReceiveMessage")
+    service = EDX.Client(server.url, offline=True)
+
+    with pytest.raises(Exception, match="Failure injected"):
+        for _ in service.drain():
+            pass
+
+
+def test_drain_without_confirm_stops_on_redelivery(server):
+    message_id = server.add_message("RIMD", content=b"<schedule/>")
+    server.add_message("RIMD", content=b"<schedule/>")
+    service = EDX.Client(server.url, offline=True)
+
+    drained = [received_message.receivedMessage.messageID for received_message in service.drain(confirm=None)]
+
+    assert drained == [message_id]
+    assert server.confirmed == []
@@ -0,0 +1,101 @@
+import threading
+
+import EDX
+from EDX.inbox import CONFIRMED, PROCESSING, RECEIVED
+
+
+def test_receive_process_confirm(server, tmp_path):
+    message_id = server.add_message("RIMD", content=b"<schedule/>")
+    service = EDX.Client(server.url, offline=True)
+
+    with EDX.Inbox(str(tmp_path / "inbox.db")) as inbox:
+        entry = inbox.receive(service, "RIMD")
+
+        assert entry.message_id == message_id
+        assert entry.state == PROCESSING
+        with open(entry.content_path, "rb") as content_file:
+            assert content_file.read() == b"<schedule/>"
+
+        inbox.complete(service, message_id)
+
+        assert inbox.get(message_id).state == CONFIRMED
+        assert inbox.receive(service, "RIMD") is None
+
+    assert server.confirmed == [message_id]
+
+
+def test_concurrent_receive_hands_out_message_once(server, tmp_path):
+    server.delay = 0.05
+    message_id = server.add_message("RIMD", content=b"<schedule/>")
+    service = EDX.Client(server.url, offline=True)
+    barrier = threading.Barrier(4)
+    results = []
+    errors = []
+
+    with EDX.Inbox(str(tmp_path / "inbox.db")) as inbox:
+
+        def receive():
+            barrier.wait()
+            try:
+                results.append(inbox.receive(service, "RIMD"))
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=receive) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert [entry.message_id for entry in results if entry is not None] == [message_id]
+        assert inbox.get(message_id).redeliveries == 3
+
+
+def test_redelivered_processed_message_is_confirmed_not_returned(server, tmp_path):
+    message_id = server.add_message("RIMD", content=b"<schedule/>")
+    service = EDX.Client(server.url, offline=True)
+
+    with EDX.Inbox(str(tmp_path / "inbox.db")) as inbox:
+        inbox.receive(service, "RIMD")
+        inbox.mark_processed(message_id)  # Crash before the confirm reached the server
+
+        assert inbox.receive(service, "RIMD") is None
+        assert inbox.get(message_id).state == CONFIRMED
+
+    assert server.confirmed == [message_id]
+
+
+def test_claims_are_released_after_crash(server, tmp_path):
+    message_id = server.add_message("RIMD", content=b"<schedule/>")
+    service = EDX.Client(server.url, offline=True)
+    path = str(tmp_path / "inbox.db")
+
+    with EDX.Inbox(path) as inbox:
+        inbox.receive(service, "RIMD")  # Crash while processing
+
+    with EDX.Inbox(path) as inbox:
+        assert inbox.get(message_id).state == RECEIVED
+        assert [entry.message_id for entry in inbox.pending()] == [message_id]
+        assert inbox.pending() == []
+        assert inbox.receive(service, "RIMD") is None  # Redelivery of a message claimed by pending()
+
+        inbox.complete(service, message_id)
+
+    assert server.confirmed == [message_id]
+
+
+def test_recover_confirms_processed_messages(server, tmp_path):
+    message_id = server.add_message("RIMD", content=b"<schedule/>")
+    service = EDX.Client(server.url, offline=True)
+    path = str(tmp_path / "inbox.db")
+
+    with EDX.Inbox(path) as inbox:
+        inbox.receive(service, "RIMD")
+        inbox.mark_processed(message_id)
+
+    with EDX.Inbox(path) as inbox:
+        assert inbox.recover(service) == [message_id]
+        assert inbox.get(message_id).state == CONFIRMED
+
+    assert server.waiting == []
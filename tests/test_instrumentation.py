@@ -0,0 +1,77 @@
+import logging
+
+import pytest
+from zeep.exceptions import Fault
+
+import EDX
+from EDX.instrumentation import PHASES, Instrumentation
+from tests.standin import StandinServer
+
+
+@pytest.mark.parametrize("engine", ["zeep", "fast"])
+def test_phase_timings(engine):
+    operations = []
+
+    with StandinServer(delay=0.05) as server:
+        service = EDX.Client(server.url, offline=True, engine=engine)
+        service.instrumentation.observers.append(operations.append)
+
+        message_id = service.send_message("10V000000000011Q", "RIMD", bytes(10_000))
+
+    operation, = operations
+
+    assert operation.name == "send_message"
+    assert operation.attributes["messageID"] == message_id
+    assert operation.attributes["businessType"] == "RIMD"
+    assert set(operation.phases) == set(PHASES)
+    assert operation.phases["network"] >= 0.05
+    assert sum(operation.phases.values()) == pytest.approx(operation.duration)
+    assert [phase for phase, start, end in operation.intervals] == list(PHASES)
+    assert operation.request_bytes > 10_000 * 4 / 3
+    assert operation.response_bytes > 0
+    assert operation.error is None
+
+
+def test_failed_call_recorded(server):
+    operations = []
+    service = EDX.Client(server.url, offline=True)
+    service.instrumentation.observers.append(operations.append)
+    server.fail("CheckMessageStatus")
+
+    with pytest.raises(Fault):
+        service.check_message_status("out-1")
+
+    assert isinstance(operations[0].error, Fault)
+
+
+def test_broken_observer_does_not_fail_call(server):
+    service = EDX.Client(server.url, offline=True)
+    service.instrumentation.observers.append(lambda operation: 1 / 0)
+
+    assert service.send_message("10V000000000011Q", "RIMD", b"<schedule/>")
+
+
+def test_debug_log_record(server, caplog):
+    service = EDX.Client(server.url, offline=True)
+
+    with caplog.at_level(logging.DEBUG, logger="EDX"):
+        service.receive_message("RIMD")
+
+    record, = [record for record in caplog.records if record.name == "EDX"]
+
+    assert record.getMessage().startswith("receive_message ")
+    assert record.edx["operation"] == "receive_message"
+    assert record.edx["remainingMessagesCount"] == 0
+    assert set(PHASES) <= set(record.edx)
+
+
+def test_disabled_without_observers_or_debug_logging():
+    logging.getLogger("EDX").setLevel(logging.INFO)
+
+    try:
+        with Instrumentation().operation("send_message") as operation:
+            operation.set(messageID="1")
+
+        assert not hasattr(operation, "phases")
+    finally:
+        logging.getLogger("EDX").setLevel(logging.NOTSET)
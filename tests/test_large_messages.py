@@ -0,0 +1,81 @@
+import hashlib
+import os
+import tracemalloc
+
+import pytest
+from zeep.exceptions import TransportError
+
+import EDX
+from EDX.large_messages import MessageTooLarge
+from tests.standin import synthetic_sha256
+
+MB = 1024 ** 2
+
+# 500 MB in memory needs about 3.2 GB with zeep, run those cases only when EDX_HUGE_TESTS=1
+huge = pytest.mark.skipif(os.environ.get("EDX_HUGE_TESTS") != "1", reason="set EDX_HUGE_TESTS=1 to run 500 MB payloads")
+
+PAYLOAD_SIZES = [50 * MB, pytest.param(500 * MB, marks=huge)]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as content_file:
+        for chunk in iter(lambda: content_file.read(MB), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+@pytest.mark.parametrize("engine", ["zeep", "fast"])
+@pytest.mark.parametrize("size", PAYLOAD_SIZES, ids=lambda size: f"{size // MB}MB")
+def test_receive_large_message_in_memory(server, engine, size):
+    message_id = server.add_message("CGM", size=size)
+    service = EDX.Client(server.url, offline=True, engine=engine, large_messages=True)
+
+    message = service.receive_message("CGM")
+
+    assert message.receivedMessage.messageID == message_id
+    assert len(message.receivedMessage.content) == size
+    assert hashlib.sha256(message.receivedMessage.content).hexdigest() == synthetic_sha256(size)
+
+
+@pytest.mark.parametrize("engine", ["zeep", "fast"])
+def test_default_parser_rejects_large_text_node(server, engine):
+    server.add_message("CGM", size=50 * MB)
+    service = EDX.Client(server.url, offline=True, engine=engine)
+
+    with pytest.raises(TransportError, match="XML_PARSE_HUGE"):
+        service.receive_message("CGM")
+
+
+@pytest.mark.parametrize("size", PAYLOAD_SIZES, ids=lambda size: f"{size // MB}MB")
+def test_receive_large_message_to_file(server, tmp_path, size):
+    server.add_message("CGM", size=size)
+    service = EDX.Client(server.url, offline=True)
+    path = tmp_path / "content.bin"
+
+    tracemalloc.start()
+    try:
+        message = service.receive_message_to_file(path, "CGM")
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert message.receivedMessage.size == size
+    assert path.stat().st_size == size
+    assert file_sha256(path) == synthetic_sha256(size)
+    assert peak < 32 * MB
+
+
+def test_max_message_size_rejects_before_reading(server):
+    message_id = server.add_message("CGM", size=50 * MB)
+    service = EDX.Client(server.url, offline=True, large_messages=True, max_message_size=10 * MB)
+
+    with pytest.raises(MessageTooLarge):
+        service.receive_message("CGM")
+
+    assert server.waiting == [message_id]
+
+    small_id = server.add_message("RIMD", content=b"<schedule/>")
+    assert service.receive_message("RIMD").receivedMessage.messageID == small_id
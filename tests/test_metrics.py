@@ -0,0 +1,83 @@
+import urllib.request
+
+import pytest
+from zeep.exceptions import Fault
+
+import EDX
+from EDX.metrics import MetricsRegistry
+
+
+def test_render_client_metrics(server):
+    service = EDX.Client(server.url, offline=True, metrics=True)
+    server.add_message("RIMD", content=b"<schedule/>")
+    server.add_message("RIMD", content=b"<schedule/>")
+
+    service.send_message("10V000000000011Q", "RIMD", b"<schedule/>")
+    service.send_message("10V000000000011Q", "RIMD", b"<schedule/>")
+    service.receive_message("RIMD")
+
+    server.fail("SendMessage")
+    with pytest.raises(Fault):
+        service.send_message("10V000000000011Q", "RIMD", b"<schedule/>")
+
+    lines = service.metrics.render().splitlines()
+
+    assert "# HELP edx_calls_total Client calls by operation" in lines
+    assert "# TYPE edx_calls_total counter" in lines
+    assert 'edx_calls_total{operation="send_message"} 3.0' in lines
+    assert 'edx_calls_total{operation="receive_message"} 1.0' in lines
+    assert 'edx_errors_total{operation="send_message",fault="SendMessageError"} 1.0' in lines
+    assert 'edx_remaining_messages{business_type="RIMD"} 1.0' in lines
+    assert "# TYPE edx_call_duration_seconds histogram" in lines
+    assert 'edx_call_duration_seconds_bucket{operation="send_message",le="+Inf"} 3.0' in lines
+    assert 'edx_call_duration_seconds_count{operation="send_message"} 3.0' in lines
+    assert any(line.startswith('edx_call_phase_seconds_count{operation="receive_message",phase="network"}') for line in lines)
+    assert any(line.startswith('edx_sent_bytes_total{operation="send_message"}') for line in lines)
+
+
+def test_histogram_buckets_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test", ["name"], buckets=(0.1, 1))
+
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, name="a")
+
+    lines = registry.render().splitlines()
+
+    assert 'test_seconds_bucket{name="a",le="0.1"} 1.0' in lines
+    assert 'test_seconds_bucket{name="a",le="1.0"} 2.0' in lines
+    assert 'test_seconds_bucket{name="a",le="+Inf"} 3.0' in lines
+    assert 'test_seconds_sum{name="a"} 5.55' in lines
+    assert histogram.value(name="a") == (3, 5.55)
+
+
+def test_labels_escaped_and_checked():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Line one\nline two", ["name"])
+    counter.inc(name='say "hi"\\')
+
+    lines = registry.render().splitlines()
+
+    assert "# HELP test_total Line one\\nline two" in lines
+    assert 'test_total{name="say \\"hi\\"\\\\"} 1.0' in lines
+    assert registry.counter("test_total", "Other") is counter
+
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+
+    with pytest.raises(ValueError):
+        registry.gauge("test_total", "Same name, other type")
+
+
+def test_serve():
+    registry = MetricsRegistry()
+    registry.calls.inc(operation="send_message")
+    server = registry.serve(port=0)
+
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read().decode() == registry.render()
+    finally:
+        server.shutdown()
+        server.server_close()
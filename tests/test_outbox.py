@@ -0,0 +1,93 @@
+import socket
+import threading
+
+import EDX
+from EDX.outbox import FAILED, IN_DOUBT, PENDING, SENDING, SENT
+from tests.standin import StandinServer
+
+
+def free_port():
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        return listener.getsockname()[1]
+
+
+def test_send_pending_messages(server, tmp_path):
+    path = tmp_path / "schedule.xml"
+    path.write_bytes(b"<schedule/>")
+    service = EDX.Client(server.url, offline=True)
+
+    with EDX.Outbox(str(tmp_path / "outbox.db")) as outbox:
+        outbox.put("10V000000000011Q", "RIMD", content=b"<a/>", ba_message_id="a")
+        outbox.put("10V000000000011Q", "RIMD", file=str(path), ba_message_id="b")
+        outbox.put("10V000000000011Q", "RIMD", content=b"<other/>", ba_message_id="a")  # Same baMessageID, kept once
+
+        entries = outbox.send(service)
+
+        assert [(entry.ba_message_id, entry.state) for entry in entries] == [("a", SENT), ("b", SENT)]
+        assert outbox.send(service) == []
+
+    assert sorted((message["baMessageID"], message["content"]) for message in server.sent) == [("a", b"<a/>"), ("b", b"<schedule/>")]
+    assert path.exists()
+
+
+def test_fault_fails_message(server, tmp_path):
+    server.fail("SendMessage")
+    service = EDX.Client(server.url, offline=True)
+
+    with EDX.Outbox(str(tmp_path / "outbox.db")) as outbox:
+        outbox.put("10V000000000011Q", "RIMD", content=b"<a/>", ba_message_id="a")
+        entry, = outbox.send(service)
+
+        assert entry.state == FAILED
+        assert "Failure injected" in entry.error
+
+        outbox.resend("a")
+        assert outbox.send(service)[0].state == SENT
+
+
+def test_unreachable_server_is_retried_then_left_pending(tmp_path):
+    service = EDX.Client(f"http://127.0.0.1:{free_port()}", offline=True)
+
+    with EDX.Outbox(str(tmp_path / "outbox.db"), retries=2, retry_interval=0.01) as outbox:
+        outbox.put("10V000000000011Q", "RIMD", content=b"<a/>", ba_message_id="a")
+        entry, = outbox.send(service)
+
+        assert entry.state == PENDING
+        assert entry.attempts == 3
+
+
+def test_retry_succeeds_when_server_comes_up(tmp_path):
+    port = free_port()
+    service = EDX.Client(f"http://127.0.0.1:{port}", offline=True)
+    server = StandinServer(port=port)
+    starter = threading.Timer(0.2, server.start)
+
+    with EDX.Outbox(str(tmp_path / "outbox.db"), retries=5, retry_interval=0.1, backoff=1.5) as outbox:
+        outbox.put("10V000000000011Q", "RIMD", content=b"<a/>", ba_message_id="a")
+        starter.start()
+        try:
+            entry, = outbox.send(service)
+        finally:
+            starter.join()
+            server.stop()
+
+    assert entry.state == SENT
+    assert entry.attempts > 1
+    assert [message["baMessageID"] for message in server.sent] == ["a"]
+
+
+def test_call_in_progress_at_crash_is_in_doubt(server, tmp_path):
+    path = str(tmp_path / "outbox.db")
+    service = EDX.Client(server.url, offline=True)
+
+    with EDX.Outbox(path) as outbox:
+        outbox.put("10V000000000011Q", "RIMD", content=b"<a/>", ba_message_id="a")
+        outbox._execute("UPDATE outbox SET state = ? WHERE ba_message_id = ?", (SENDING, "a"))  # Process died during the call
+
+    with EDX.Outbox(path) as outbox:
+        assert outbox.get("a").state == IN_DOUBT
+        assert outbox.send(service) == []
+
+        outbox.resend()
+        assert outbox.send(service)[0].state == SENT
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+import EDX
+from tests.standin import StandinServer
+
+
+def run_until(prefetcher, handler, count, timeout=10):
+    """Runs prefetcher.run(handler) on a thread until handler was called count times"""
+
+    handled = []
+
+    def handle(received_message):
+        handler(received_message)
+        handled.append(received_message.receivedMessage.messageID)
+        if len(handled) == count:
+            prefetcher.stop()
+
+    thread = threading.Thread(target=prefetcher.run, args=(handle,), daemon=True)
+    thread.start()
+    thread.join(timeout)
+
+    assert not thread.is_alive(), f"run() did not finish, handled {handled}"
+    return handled
+
+
+@pytest.mark.parametrize("head_of_line", [True, False])
+def test_run_acks_every_message(head_of_line):
+
+    with StandinServer(head_of_line=head_of_line) as server:
+        message_ids = [server.add_message("RIMD", content=f"<schedule>{index}</schedule>".encode()) for index in range(5)]
+
+        service = EDX.Client(server.url, offline=True)
+        with EDX.Prefetcher(service, "RIMD", depth=2, min_interval=0.01, max_interval=0.05) as prefetcher:
+            handled = run_until(prefetcher, lambda received_message: None, 5)
+
+        assert handled == message_ids
+        assert server.confirmed == message_ids
+        assert server.waiting == []
+
+
+def test_message_not_acked_is_handed_out_again():
+
+    with StandinServer(head_of_line=True) as server:
+        message_id = server.add_message("RIMD", content=b"<schedule/>")
+        server.add_message("RIMD", content=b"<schedule/>")
+
+        service = EDX.Client(server.url, offline=True)
+        with EDX.Prefetcher(service, "RIMD", min_interval=0.01, max_interval=0.05, ack_timeout=0.2) as prefetcher:
+            messages = iter(prefetcher)
+
+            first = next(messages)  # Dropped without ack
+            again = next(messages)
+            prefetcher.ack(again).result()
+            following = next(messages)
+            prefetcher.ack(following).result()
+
+        assert first.receivedMessage.messageID == again.receivedMessage.messageID == message_id
+        assert following.receivedMessage.messageID != message_id
+        assert server.waiting == []
+
+
+def test_waiting_for_messages_does_not_spin_with_zero_interval():
+
+    with StandinServer(head_of_line=True) as server:
+        server.add_message("RIMD", content=b"<schedule/>")
+
+        service = EDX.Client(server.url, offline=True)
+        with EDX.Prefetcher(service, "RIMD", min_interval=0, max_interval=1) as prefetcher:
+            messages = iter(prefetcher)
+            next(messages)  # Not acked, the receive thread waits for the confirm
+
+            threading.Timer(0.5, prefetcher.stop).start()
+            started = time.thread_time()
+
+            assert list(messages) == []
+            assert time.thread_time() - started < 0.1
@@ -0,0 +1,99 @@
+import EDX
+from tests.standin import StandinServer
+
+
+def test_accepted_message_downloaded(server):
+    message_id = server.add_message("RIMD", content=b"<schedule/>", sender="10X1001A1001A39W")
+    service = EDX.Client(server.url, offline=True)
+    headers = []
+
+    def accept(header):
+        headers.append(header)
+        return header.senderCode == "10X1001A1001A39W"
+
+    received_message, accepted = service.receive_selected(accept, "RIMD", auto_confirm=True)
+
+    assert accepted
+    assert headers[0].messageID == message_id and headers[0].content is None
+    assert received_message.receivedMessage.content == b"<schedule/>"
+    assert server.confirmed == [message_id]
+
+
+def test_rejected_message_not_downloaded(server):
+    message_id = server.add_message("CGM", content=b"<model/>")
+    service = EDX.Client(server.url, offline=True)
+
+    received_message, accepted = service.receive_selected(lambda header: False)
+
+    assert not accepted
+    assert received_message.receivedMessage.messageID == message_id
+    assert received_message.receivedMessage.content is None
+    assert server.calls["ReceiveMessage"] == 1
+    assert server.waiting == [message_id]
+
+
+def test_confirm_rejected(server):
+    rejected_id = server.add_message("CGM", content=b"<model/>")
+    next_id = server.add_message("RIMD", content=b"<schedule/>")
+    service = EDX.Client(server.url, offline=True)
+
+    received_message, accepted = service.receive_selected(lambda header: header.businessType == "RIMD", confirm_rejected=True)
+
+    assert not accepted and received_message.receivedMessage.messageID == rejected_id
+    assert server.confirmed == [rejected_id]
+    assert server.calls["ReceiveMessage"] == 1
+
+    received_message, accepted = service.receive_selected(lambda header: header.businessType == "RIMD")
+
+    assert accepted and received_message.receivedMessage.messageID == next_id
+
+
+def test_empty_queue(server):
+    service = EDX.Client(server.url, offline=True)
+
+    received_message, accepted = service.receive_selected(lambda header: True)
+
+    assert received_message.receivedMessage is None and not accepted
+
+
+def test_message_taken_by_another_consumer_is_checked_again():
+
+    with StandinServer(head_of_line=False) as server:
+        taken_id = server.add_message("RIMD", content=b"<first/>")
+        next_id = server.add_message("RIMD", content=b"<second/>")
+        service = EDX.Client(server.url, offline=True)
+        other = EDX.Client(server.url, offline=True)
+        headers = []
+
+        def accept(header):
+            if not headers:
+                other.receive_message("RIMD")  # Downloads the peeked message before this consumer does
+            headers.append(header.messageID)
+            return True
+
+        received_message, accepted = service.receive_selected(accept, "RIMD")
+
+        assert accepted
+        assert headers == [taken_id, next_id]
+        assert received_message.receivedMessage.content == b"<second/>"
+
+
+def test_message_downloaded_instead_and_rejected():
+
+    with StandinServer(head_of_line=False) as server:
+        taken_id = server.add_message("RIMD", content=b"<first/>")
+        rejected_id = server.add_message("CGM", content=b"<model/>")
+        service = EDX.Client(server.url, offline=True)
+        other = EDX.Client(server.url, offline=True)
+
+        def accept(header):
+            if header.messageID == taken_id:
+                other.receive_message("RIMD", auto_confirm=True)
+            return header.businessType == "RIMD"
+
+        received_message, accepted = service.receive_selected(accept, confirm_rejected=True)
+
+        assert not accepted
+        assert received_message.receivedMessage.messageID == rejected_id
+        assert server.confirmed == [taken_id, rejected_id]
+        assert server.calls["ReceiveMessage"] == 3
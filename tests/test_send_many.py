@@ -0,0 +1,58 @@
+import pytest
+from zeep.exceptions import Fault
+
+import EDX
+from tests.standin import StandinServer
+
+
+def messages(count, consumed=None):
+    for index in range(count):
+        if consumed is not None:
+            consumed.append(index)
+        yield {"receiver_EIC": "10V000000000011Q", "business_type": "RIMD", "content": f"<schedule>{index}</schedule>".encode()}
+
+
+def sent_content(server):
+    return {sent["messageID"]: sent["content"] for sent in server.sent}
+
+
+def test_results_in_input_order():
+
+    with StandinServer(delay=0.01) as server:
+        service = EDX.Client(server.url, offline=True, pool_maxsize=8)
+        results = list(service.send_many(messages(40), max_workers=8))
+
+        assert [result.index for result in results] == list(range(40))
+        assert all(result.error is None for result in results)
+
+        content = sent_content(server)
+        assert [content[result.message_id] for result in results] == [f"<schedule>{index}</schedule>".encode() for index in range(40)]
+
+
+def test_failure_reported_per_message(server, tmp_path):
+    path = tmp_path / "model.zip"
+    path.write_bytes(b"zip")
+    server.fail("SendMessage")
+
+    service = EDX.Client(server.url, offline=True)
+    batch = [{"receiver_EIC": "10V000000000011Q", "business_type": "RIMD", "content": b"<schedule/>"},
+             {"receiver_EIC": "10V000000000011Q", "business_type": "CGM", "file": str(tmp_path / "missing.zip")},
+             {"receiver_EIC": "10V000000000011Q", "business_type": "CGM", "file": str(path)}]
+
+    results = list(service.send_many(batch, max_workers=1))
+
+    assert isinstance(results[0].error, Fault) and results[0].message_id is None
+    assert isinstance(results[1].error, FileNotFoundError)
+    assert results[2].error is None and sent_content(server)[results[2].message_id] == b"zip"
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 4])
+def test_input_consumed_lazily(server, max_in_flight):
+    consumed, results = [], []
+    service = EDX.Client(server.url, offline=True)
+
+    for result in service.send_many(messages(20, consumed), max_workers=2, max_in_flight=max_in_flight):
+        results.append(result)
+        assert len(consumed) <= len(results) + max_in_flight
+
+    assert len(results) == 20
@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+from zeep.exceptions import Fault
+
+import EDX
+from EDX.status import DELIVERY_STATES
+
+
+@pytest.fixture
+def service(server):
+    return EDX.Client(server.url, offline=True, pool_maxsize=4)
+
+
+def test_track_many_until_terminal_state(server, service):
+    changes = []
+    lock = threading.Lock()
+
+    def on_change(message_id, status):
+        with lock:
+            changes.append((message_id, status.state))
+
+    message_ids = [service.send_message("10V000000000011Q", "RIMD", b"<schedule/>") for _ in range(10)]
+
+    with EDX.StatusTracker(service, min_interval=0.05, max_interval=0.1, terminal_states=DELIVERY_STATES, on_change=on_change) as tracker:
+        futures = tracker.track_many(message_ids)
+        assert tracker.track(message_ids[0]) is futures[message_ids[0]]
+
+        statuses = {message_id: future.result(timeout=10).state for message_id, future in futures.items()}
+
+    assert statuses == dict.fromkeys(message_ids, "DELIVERED")
+    for message_id in message_ids:
+        assert [state for changed_id, state in changes if changed_id == message_id] == ["ACCEPTED", "DELIVERING", "DELIVERED"]
+
+
+def test_fault_fails_future(server, service):
+    message_id = service.send_message("10V000000000011Q", "RIMD", b"<schedule/>")
+    server.fail("CheckMessageStatus")
+
+    with EDX.StatusTracker(service, min_interval=0.01) as tracker:
+        with pytest.raises(Fault):
+            tracker.track(message_id).result(timeout=10)
+
+
+def test_untrack_and_close_cancel(server, service):
+    first, second = (service.send_message("10V000000000011Q", "RIMD", b"<schedule/>") for _ in range(2))
+
+    tracker = EDX.StatusTracker(service, min_interval=60)
+    futures = tracker.track_many([first, second])
+
+    tracker.untrack(first)
+    assert futures[first].cancelled()
+    assert tracker.states() == {second: None}
+
+    tracker.close()
+    assert futures[second].cancelled()
+
+    with pytest.raises(RuntimeError):
+        tracker.track(first)
@@ -0,0 +1,82 @@
+import pytest
+
+import EDX
+from EDX.tracing import DEFAULT_MAX_SPANS, InMemoryExporter, Tracer
+
+
+def test_default_exporter_is_bounded(server):
+    tracer = Tracer()
+    service = EDX.Client(server.url, offline=True, tracer=tracer)
+
+    for _ in range(DEFAULT_MAX_SPANS // 4 + 10):
+        service.send_message("10V000000000011Q", "RIMD", b"<schedule/>")
+
+    assert len(tracer.exporter.spans) == DEFAULT_MAX_SPANS
+
+
+def test_call_spans_are_children_of_user_span(server):
+    tracer = Tracer(InMemoryExporter())
+    service = EDX.Client(server.url, offline=True, tracer=tracer)
+
+    with tracer.span("import schedules") as span:
+        service.send_message("10V000000000011Q", "RIMD", b"<schedule/>")
+
+    call, *phases, user = tracer.exporter.spans
+
+    assert user is span
+    assert call.name == "EDX send_message" and call.parent_id == span.span_id
+    assert {phase.parent_id for phase in phases} == {call.span_id}
+    assert {recorded.trace_id for recorded in tracer.exporter.spans} == {span.trace_id}
+
+
+@pytest.fixture
+def otel():
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    spans = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(spans))
+
+    return provider.get_tracer("test"), spans
+
+
+def test_opentelemetry_spans_connect(server, otel):
+    from opentelemetry import trace
+    from EDX.tracing import OpenTelemetryExporter
+
+    otel_tracer, otel_spans = otel
+    tracer = Tracer(OpenTelemetryExporter(otel_tracer))
+    service = EDX.Client(server.url, offline=True, tracer=tracer)
+
+    with otel_tracer.start_as_current_span("application") as application:
+        with tracer.span("import schedules") as span:
+            assert trace.get_current_span().get_span_context().span_id == int(span.span_id, 16)
+            service.send_message("10V000000000011Q", "RIMD", b"<schedule/>")
+
+    finished = {otel_span.name: otel_span for otel_span in otel_spans.get_finished_spans()}
+    user = finished["import schedules"]
+    call = finished["EDX send_message"]
+
+    assert span.traceparent == f"00-{user.context.trace_id:032x}-{user.context.span_id:016x}-01"
+    assert user.parent.span_id == application.get_span_context().span_id
+    assert call.parent.span_id == user.context.span_id
+    assert finished["EDX HTTP transfer"].parent.span_id == call.context.span_id
+    assert {otel_span.context.trace_id for otel_span in finished.values()} == {application.get_span_context().trace_id}
+
+
+def test_opentelemetry_call_without_user_span(server, otel):
+    from EDX.tracing import OpenTelemetryExporter
+
+    otel_tracer, otel_spans = otel
+    tracer = Tracer(OpenTelemetryExporter(otel_tracer))
+    service = EDX.Client(server.url, offline=True, tracer=tracer)
+
+    with otel_tracer.start_as_current_span("application") as application:
+        service.send_message("10V000000000011Q", "RIMD", b"<schedule/>")
+
+    finished = {otel_span.name: otel_span for otel_span in otel_spans.get_finished_spans()}
+
+    assert finished["EDX send_message"].parent.span_id == application.get_span_context().span_id
+    assert finished["EDX envelope build"].parent.span_id == finished["EDX send_message"].context.span_id